@@ -0,0 +1,193 @@
+import sqlite3
+import threading
+import time
+
+
+class Overloaded(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_rules(spec):
+    # "chat=20/60,image=60/60" -> {'chat': (20, 60.0), 'image': (60, 60.0)}
+    rules = {}
+    for part in spec.split(','):
+        name, _, limit = part.partition('=')
+        count, _, period = limit.partition('/')
+        if name.strip() and count.strip():
+            rules[name.strip()] = (int(count), float(period or 60))
+    return rules
+
+
+def _refill(tokens, updated, capacity, rate, now):
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+class MemoryBuckets:
+    # Token buckets for this process only
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._buckets = {}  # key -> (tokens, updated, capacity, rate)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        # Returns 0 when a token was taken, else seconds until one is available
+        with self._lock:
+            bucket = self._buckets.get(key)
+            tokens = capacity if bucket is None else _refill(bucket[0], bucket[1], capacity, rate, now)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now, capacity, rate)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now, capacity, rate)
+                wait = (1 - tokens) / rate
+            if len(self._buckets) > self.max_entries:
+                self._prune(now)
+            return wait
+
+    def _prune(self, now):
+        # A bucket that has refilled is the same as no bucket at all
+        for key, (tokens, updated, capacity, rate) in list(self._buckets.items()):
+            if _refill(tokens, updated, capacity, rate, now) >= capacity:
+                del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBuckets:
+    # Token buckets shared by every worker process on the host
+    def __init__(self, path, timeout=1.0, max_idle=3600):
+        self.path = path
+        self.timeout = timeout
+        self.max_idle = max_idle  # buckets untouched this long are deleted
+        self._pruned = 0.0
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS rate_buckets '
+                               '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def take(self, key, capacity, rate, now):
+        connection = self._connection()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute('SELECT tokens, updated FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+            tokens = capacity if row is None else _refill(row[0], row[1], capacity, rate, now)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            connection.execute('INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                               (key, tokens - 1 if tokens >= 1 else tokens, now))
+            if now - self._pruned > 60:
+                self._pruned = now
+                connection.execute('DELETE FROM rate_buckets WHERE updated < ?', (now - self.max_idle,))
+            connection.execute('COMMIT')
+            return wait
+        except sqlite3.Error as e:
+            # Fail open: a locked or broken limiter database must not take the site down
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            print(f"Rate limiter error: {str(e)}")
+            return 0.0
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM rate_buckets').fetchone()[0]
+
+
+class RateLimiter:
+    # Per-client token buckets, one set per rule; unknown rules are unlimited
+    def __init__(self, rules, store=None):
+        self.rules = rules
+        self.store = store if store is not None else MemoryBuckets()
+        self.rejected = {}
+        self._lock = threading.Lock()
+
+    def check(self, rule, client):
+        # Returns 0 when admitted, else the seconds to wait before retrying
+        limit = self.rules.get(rule)
+        if limit is None:
+            return 0.0
+        count, period = limit
+        wait = self.store.take(f"{rule}:{client}", count, count / period, time.time())
+        if wait:
+            with self._lock:
+                self.rejected[rule] = self.rejected.get(rule, 0) + 1
+        return wait
+
+    def stats(self):
+        with self._lock:
+            rejected = dict(self.rejected)
+        return {
+            'rules': {name: {'requests': count, 'per_seconds': period} for name, (count, period) in self.rules.items()},
+            'buckets': len(self.store),
+            'rejected': rejected,
+        }
+
+
+class Slot:
+    # A held ConcurrencyGate slot. release() is idempotent, so a streaming
+    # response can release from both its generator and its close hook.
+    def __init__(self, gate):
+        self.gate = gate  # None for an unlimited gate
+        self.released = False
+
+    def release(self):
+        if self.gate is None:
+            return
+        with self.gate._lock:
+            if self.released:
+                return
+            self.released = True
+            self.gate.active -= 1
+        self.gate._semaphore.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class ConcurrencyGate:
+    # Caps calls in flight across all threads; a full gate raises Overloaded
+    # after `wait` seconds instead of queueing the caller
+    def __init__(self, limit, wait=0.0, retry_after=2):
+        self.limit = limit
+        self.wait = wait
+        self.retry_after = retry_after
+        self.active = 0
+        self.rejected = 0
+        self._semaphore = threading.BoundedSemaphore(limit) if limit > 0 else None
+        self._lock = threading.Lock()
+
+    def saturated(self):
+        return self._semaphore is not None and self.active >= self.limit
+
+    def slot(self):
+        # Takes a slot now (raising Overloaded if none frees up in time) and
+        # returns it; use as a context manager or call release()
+        if self._semaphore is None:
+            return Slot(None)
+        if self.wait > 0:
+            acquired = self._semaphore.acquire(timeout=self.wait)
+        else:
+            acquired = self._semaphore.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded('Too many AI requests in progress, try again shortly', self.retry_after)
+        with self._lock:
+            self.active += 1
+        return Slot(self)
+
+    def stats(self):
+        return {'limit': self.limit, 'active': self.active, 'rejected': self.rejected}
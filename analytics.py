@@ -0,0 +1,172 @@
+from datetime import date, datetime, timedelta
+
+METRICS = ('weight', 'body_fat', 'calorie_balance', 'workout_duration', 'sleep_hours')
+PERIODS = ('day', 'week', 'month')
+
+# How many rollups of each period the dashboard reads
+WINDOWS = {'day': 30, 'week': 12, 'month': 12}
+
+
+def period_start(day, period):
+    if isinstance(day, datetime):
+        day = day.date()
+    if period == 'day':
+        return day
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown period: {period}")
+
+
+def entry_values(entry):
+    balance = None
+    if entry.calories_consumed is not None and entry.calories_burned is not None:
+        balance = entry.calories_consumed - entry.calories_burned
+    return {
+        'weight': entry.weight,
+        'body_fat': entry.body_fat,
+        'calorie_balance': balance,
+        'workout_duration': entry.workout_duration,
+        'sleep_hours': entry.sleep_hours,
+    }
+
+
+def entry_deltas(entry, sign=1):
+    # Column increments an entry makes to its rollups; sign=-1 removes a
+    # previously counted entry (used when an entry is replaced)
+    deltas = {'entries': sign}
+    for metric, value in entry_values(entry).items():
+        if value is None:
+            continue
+        deltas[f'{metric}_sum'] = sign * value
+        deltas[f'{metric}_count'] = sign
+    return deltas
+
+
+def merge_deltas(total, deltas):
+    for column, value in deltas.items():
+        total[column] = total.get(column, 0) + value
+    return total
+
+
+def average(rollup, metric):
+    count = getattr(rollup, f'{metric}_count') or 0
+    if not count:
+        return None
+    return round(getattr(rollup, f'{metric}_sum') / count, 2)
+
+
+def pooled_average(rollups, metric):
+    count = sum(getattr(r, f'{metric}_count') or 0 for r in rollups)
+    if not count:
+        return None
+    return round(sum(getattr(r, f'{metric}_sum') or 0 for r in rollups) / count, 2)
+
+
+def trend_slope(points):
+    # Least-squares slope of (day number, value) pairs, in units per day
+    points = [(x, y) for x, y in points if y is not None]
+    if len(points) < 2:
+        return None
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var_x:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+
+def series(rollups):
+    return [
+        dict({'start': r.period_start.isoformat(), 'entries': r.entries},
+             **{metric: average(r, metric) for metric in METRICS})
+        for r in rollups
+    ]
+
+
+def summarize(rollups_by_period, today=None):
+    # rollups_by_period maps each period to its most recent rollups, oldest first
+    today = today or date.today()
+    daily = rollups_by_period.get('day', [])
+    weekly = rollups_by_period.get('week', [])
+
+    week_start = period_start(today, 'week')
+    recent = [r for r in daily if r.period_start > today - timedelta(days=7)]
+    current_week = next((r for r in weekly if r.period_start == week_start), None)
+
+    trend = {}
+    for metric in METRICS:
+        slope = trend_slope([(r.period_start.toordinal(), average(r, metric)) for r in daily])
+        trend[metric] = round(slope * 7, 3) if slope is not None else None
+
+    latest = {}
+    for metric in METRICS:
+        latest[metric] = next((average(r, metric) for r in reversed(daily)
+                               if average(r, metric) is not None), None)
+
+    return {
+        'latest': latest,
+        'rolling_7d': {metric: pooled_average(recent, metric) for metric in METRICS},
+        'trend_per_week': trend,
+        'current_week': {
+            'entries': current_week.entries if current_week else 0,
+            'workout_minutes': (current_week.workout_duration_sum or 0) if current_week else 0,
+            'sleep_hours': (current_week.sleep_hours_sum or 0) if current_week else 0,
+        },
+        'daily': series(daily),
+        'weekly': series(weekly),
+        'monthly': series(rollups_by_period.get('month', [])),
+    }
+
+
+def lttb(points, threshold):
+    # Largest-Triangle-Three-Buckets: keeps the visual shape of a series
+    # with `threshold` points; `points` are (x, y) pairs sorted by x
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, len(points))
+        next_bucket = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        ax, ay = points[a]
+        best, best_area = start, -1
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def bucket_average(points, buckets):
+    # Averages points into `buckets` equal-width x ranges
+    if buckets >= len(points) or buckets < 1:
+        return list(points)
+    first, last = points[0][0], points[-1][0]
+    width = (last - first) / buckets or 1
+    sums = {}
+    for x, y in points:
+        index = min(int((x - first) / width), buckets - 1)
+        total = sums.setdefault(index, [0, 0, 0])
+        total[0] += x
+        total[1] += y
+        total[2] += 1
+    return [(sx / n, sy / n) for _, (sx, sy, n) in sorted(sums.items())]
+
+
+def downsample(points, target, method='lttb'):
+    if method == 'bucket':
+        return bucket_average(points, target)
+    return lttb(points, target)
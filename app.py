@@ -1,27 +1,68 @@
-from flask import Flask, abort, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Flask, Response, abort, render_template, request, jsonify, session, redirect, url_for, flash, stream_with_context, copy_current_request_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from sqlalchemy import JSON, Integer
 from werkzeug.security import generate_password_hash, check_password_hash
 import requests
+import atexit
+import csv
+import hmac
+import io
+import json
+import math
 import os
 import random
 import re
+import uuid
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 from datetime import datetime
+from functools import wraps
+import analytics
+import database
+import downloads
+import image_pipeline
+import metrics
+import plan_parser
+from admission import ConcurrencyGate, Overloaded, RateLimiter, SQLiteBuckets, parse_rules
+from chat_memory import SQLConversationStore
+from completion_cache import CompletionCache, plan_key
+from http_client import HttpClient
+from image_cache import ImageCache, normalize_query, try_lock
+from jobs import JobQueue, JobRejected
+from llm import LLMClient
+from local_images import LocalImageIndex
+from nutrition_engine import NutritionEngine, get_bmi_note, render as render_nutrition_plan
+from static_assets import StaticAssets
+from user_cache import CachedUser, UserCache
 
 load_dotenv()
+STARTED = time.perf_counter()
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///primalfit.db')
+database.configure(app)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Content-hashed static URLs with immutable caching and precompressed CSS
+static_assets = StaticAssets(
+    app.static_folder,
+    watch=os.getenv('STATIC_WATCH', '0') == '1',
+    max_age=int(os.getenv('STATIC_MAX_AGE', 300))
+)
+static_assets.install(app)
+
 # Initialize extensions
 db = SQLAlchemy(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
+# Authenticated requests resolve the user without a query while cached
+user_cache = UserCache(ttl=int(os.getenv('USER_CACHE_TTL', 300)))
+USER_SESSION_IDENTITY = os.getenv('USER_SESSION_IDENTITY', '1') == '1'
+
 # Database Model
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -31,6 +72,7 @@ class User(UserMixin, db.Model):
     password = db.Column(db.String(200), nullable=False)
 
 class Progress(db.Model):
+    __table_args__ = (db.Index('ix_progress_user_date', 'user_id', 'date', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date = db.Column(db.Date, default=datetime.utcnow)
@@ -42,17 +84,132 @@ class Progress(db.Model):
     sleep_hours = db.Column(db.Float)  
     sleep_quality = db.Column(db.Integer)
 
+# Server-side chat history (see chat_memory); the session cookie only carries the id
+class ChatConversation(db.Model):
+    chat_id = db.Column(db.String(32), primary_key=True)
+    turns = db.Column(db.Text, nullable=False, default='[]')
+    summary = db.Column(db.Text, nullable=False, default='')
+    updated = db.Column(db.Float, nullable=False, index=True)
+
+# Incrementally maintained per-user daily/weekly/monthly aggregates of Progress
+class ProgressRollup(db.Model):
+    __table_args__ = (db.UniqueConstraint('user_id', 'period', 'period_start'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    period = db.Column(db.String(5), nullable=False)
+    period_start = db.Column(db.Date, nullable=False)
+    entries = db.Column(db.Integer, default=0)
+    weight_sum = db.Column(db.Float, default=0)
+    weight_count = db.Column(db.Integer, default=0)
+    body_fat_sum = db.Column(db.Float, default=0)
+    body_fat_count = db.Column(db.Integer, default=0)
+    calorie_balance_sum = db.Column(db.Float, default=0)
+    calorie_balance_count = db.Column(db.Integer, default=0)
+    workout_duration_sum = db.Column(db.Float, default=0)
+    workout_duration_count = db.Column(db.Integer, default=0)
+    sleep_hours_sum = db.Column(db.Float, default=0)
+    sleep_hours_count = db.Column(db.Integer, default=0)
+
+# Engine tuning plus create-all/index migration, once per process at startup
+database.init_database(app, db)
+
+# Request timing, SQL/outbound spans and /metrics (METRICS=0 disables).
+# /metrics needs METRICS_TOKEN unless METRICS_PUBLIC=1, and the per-request
+# Server-Timing breakdown is only sent with SERVER_TIMING=1
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_PUBLIC = os.getenv('METRICS_PUBLIC', '0') == '1'
+SERVER_TIMING = os.getenv('SERVER_TIMING', '0') == '1'
+SLOW_REQUEST = float(os.getenv('SLOW_REQUEST_SECONDS', 2))
+
+if metrics.ENABLED:
+    with app.app_context():
+        metrics.instrument_engine(db.engine)
+
+    @app.before_request
+    def _start_trace():
+        metrics.start_trace()
+
+    @app.after_request
+    def _finish_trace(response):
+        elapsed, spans = metrics.finish_trace()
+        if elapsed is None:
+            return response
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.registry.observe('primalfit_request_seconds', elapsed,
+                                 endpoint=endpoint, method=request.method, status=response.status_code)
+        if SERVER_TIMING:
+            response.headers['Server-Timing'] = metrics.server_timing(elapsed, spans)
+        if elapsed > SLOW_REQUEST:
+            detail = ', '.join(f"{kind} {count}x {seconds:.3f}s"
+                               for kind, (count, seconds) in metrics.breakdown(spans).items())
+            print(f"Slow request {request.method} {request.path}: {elapsed:.3f}s ({detail or 'no spans'})")
+        return response
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Session identity first, then the in-process cache, then the database
+    user_id = int(user_id)
+    identity = session.get('identity')
+    issued = identity.get('issued', 0) if identity else 0
+    # The copy lives as long as the cookie, so re-check it every TTL
+    if USER_SESSION_IDENTITY and identity and identity.get('id') == user_id \
+            and time.time() - issued < user_cache.ttl and not user_cache.is_stale(user_id, issued):
+        return CachedUser(**{k: identity[k] for k in ('id', 'name', 'age', 'email')})
+
+    user = user_cache.get(user_id)
+    if user is None:
+        model = db.session.get(User, user_id)
+        if model is None:
+            return None
+        user = CachedUser.from_model(model)
+        user_cache.put(user)
+    if USER_SESSION_IDENTITY:
+        remember_identity(user)
+    return user
+
+def remember_identity(user):
+    session['identity'] = dict(CachedUser.from_model(user).to_dict(), issued=time.time())
+
+@db.event.listens_for(User, 'after_update')
+@db.event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
 
 # API Keys
-GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 STABILITY_API_KEY = os.getenv('STABILITY_API_KEY')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 PEXELS_API_KEY = os.getenv('PEXELS_API_KEY')
 UNSPLASH_ACCESS_KEY = os.getenv('UNSPLASH_ACCESS_KEY')
 
+# Shared outbound client: keep-alive pools, retries and a circuit breaker per provider
+http = HttpClient(
+    timeout=(3.05, float(os.getenv('HTTP_TIMEOUT', 10))),
+    retries=int(os.getenv('HTTP_RETRIES', 2)),
+    breaker_threshold=int(os.getenv('HTTP_BREAKER_THRESHOLD', 5)),
+    breaker_reset=float(os.getenv('HTTP_BREAKER_RESET', 30))
+)
+# Admission control: a cap on outbound AI calls in flight (LLM completions and
+# image generation) plus per-client token buckets on the AI endpoints
+ai_gate = ConcurrencyGate(
+    int(os.getenv('AI_MAX_CONCURRENCY', 16)),
+    wait=float(os.getenv('AI_QUEUE_WAIT', 0)),
+    retry_after=int(os.getenv('AI_RETRY_AFTER', 2))
+)
+RATE_LIMIT_DB = os.getenv('RATE_LIMIT_DB')  # SQLite file shared by all workers; in memory when unset
+rate_limiter = RateLimiter(
+    parse_rules(os.getenv('RATE_LIMITS', 'chat=20/60,image=60/60,nutrition=10/60,workout=10/60')),
+    store=SQLiteBuckets(RATE_LIMIT_DB) if RATE_LIMIT_DB else None
+)
+# Chat completions backend: LLM_BACKEND=groq|openai|local (llm_stub.py for load tests)
+llm = LLMClient.from_env(http, gate=ai_gate)
+CHAT_MAX_TOKENS = int(os.getenv('LLM_CHAT_MAX_TOKENS', 500))
+PLAN_MAX_TOKENS = int(os.getenv('LLM_PLAN_MAX_TOKENS', 1500))
+# Nutrition plans are computed locally; the LLM only adds a few optional tips
+NUTRITION_TIPS = os.getenv('NUTRITION_TIPS', '1') == '1'
+TIPS_MAX_TOKENS = int(os.getenv('LLM_TIPS_MAX_TOKENS', 150))
+# Tips are optional extras on a finished plan: give up fast rather than retry
+TIPS_TIMEOUT = (3.05, float(os.getenv('LLM_TIPS_TIMEOUT', 5)))
+
 BASE_PROMPT = [{
     "role": "system",
     "content": """
@@ -71,57 +228,462 @@ def clean_response(text):
     text = re.sub(r'<[^>]+>', '', text)
     return text.strip()
 
+class ResponseCleaner:
+    # Incremental clean_response for streamed tokens
+    def __init__(self):
+        self.buffer = ''
+        self.whitespace = ''
+        self.started = False
+
+    def feed(self, chunk):
+        text = self.buffer + chunk
+        # Hold back a tag that hasn't been closed yet
+        tag_start = text.find('<', text.rfind('>') + 1)
+        cut = tag_start if tag_start != -1 else len(text)
+        self.buffer = text[cut:]
+        return self._emit(text[:cut])
+
+    def finish(self):
+        text = self._emit(self.buffer)
+        self.buffer = ''
+        return text
+
+    def _emit(self, text):
+        text = re.sub(r'\*\*|\*|`', '', text)
+        text = re.sub(r'<[^>]+>', '', text)
+        if not self.started:
+            text = text.lstrip()
+            self.started = bool(text)
+        # Trailing whitespace only goes out once more text follows it
+        text = self.whitespace + text
+        stripped = text.rstrip()
+        self.whitespace = text[len(stripped):]
+        return stripped
+
+def stream_cleaned(tokens):
+    cleaner = ResponseCleaner()
+    for token in tokens:
+        text = cleaner.feed(token)
+        if text:
+            yield text
+    text = cleaner.finish()
+    if text:
+        yield text
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events, slot=None):
+    # `slot` is a reserved AI gate slot; it is released when the response
+    # closes, even if the client leaves before the stream starts
+    response = Response(stream_with_context(events), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    if slot is not None:
+        response.call_on_close(slot.__exit__)
+    return response
+
 # Image Generation Functions
-def generate_ai_image(query):
+image_cache = ImageCache(
+    "static/generated",
+    max_entries=int(os.getenv('IMAGE_CACHE_MAX_ENTRIES', 200)),
+    max_bytes=int(os.getenv('IMAGE_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    ttl=int(os.getenv('IMAGE_CACHE_TTL', 7 * 24 * 3600)),
+    on_remove=lambda name: local_images.remove(f'generated/{name}'),
+    # Everything under static/ is public; the index stays in the instance folder
+    index_path=os.getenv('IMAGE_CACHE_INDEX', os.path.join(app.instance_path, 'image_cache.json')),
+    # Partial downloads stay out of static/ too; same filesystem so they move in with a rename
+    incoming=os.getenv('IMAGE_INCOMING_DIR', os.path.join(app.instance_path, 'image_incoming'))
+)
+# Persist the last access times recorded since the previous save
+atexit.register(image_cache.flush)
+
+# Keyword index over images already on disk; 'offline' mode uses nothing else
+local_images = LocalImageIndex("static")
+
+def index_local_images():
+    return local_images.build((f'generated/{name}', query) for name, query in image_cache.files())
+
+index_local_images()
+
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+
+def _download(response):
+    return downloads.stream_to_temp(response, image_cache.incoming, IMAGE_MAX_BYTES)
+
+def _discard_result(future):
+    # A provider that lost the race may still have downloaded its image
+    if not future.cancelled() and isinstance(future.result(), downloads.Download):
+        downloads.discard(future.result().path)
+
+IMAGE_PROVIDER_MODE = os.getenv('IMAGE_PROVIDER_MODE', 'race')  # 'race', 'sequential' or 'offline'
+IMAGE_OFFLINE = IMAGE_PROVIDER_MODE == 'offline'
+IMAGE_DEADLINE = float(os.getenv('IMAGE_DEADLINE', 8))
+IMAGE_PROVIDER_COUNT = 4  # see _fetch_image
+# A thread per provider for every round the AI gate admits, so one round's
+# providers never queue behind another's
+image_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('IMAGE_WORKERS', max(ai_gate.limit, 4) * IMAGE_PROVIDER_COUNT)),
+    thread_name_prefix='image-provider')
+
+def _fetch_from(service, query, stop=None):
+    # Returns a Download for remote images, a static path for local ones, or
+    # None. Once `stop` is set the race is over and nothing is downloaded.
+    with metrics.span('image', service.__name__.replace('_try_', '')) as span:
+        image = service(query)
+        if not image:
+            span.fail()
+            return None
+        if stop is not None and stop.is_set():
+            if isinstance(image, requests.Response):
+                image.close()
+            return None
+        if isinstance(image, requests.Response):
+            # Stability streams the PNG itself
+            return _download(image)
+        if image.startswith("http"):
+            response = http.get('download', image, stream=True, timeout=(3.05, 10))
+            response.raise_for_status()
+            return _download(response)
+        return image
+
+def _fetch_logged(service, query, stop=None):
     try:
-        # Create necessary directories
-        os.makedirs("static/generated", exist_ok=True)
-        os.makedirs("static/images/fallback", exist_ok=True)
-
-        # Generate unique filename
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        filename = f"generated/{timestamp}_{query[:20]}.png"
-        full_path = os.path.join("static", filename)
-
-        # Try external services
-        services = [
-            _try_stability_ai,
-            _try_dalle,
-            _try_pexels,
-            _try_unsplash
-        ]
-        random.shuffle(services)
-
-        for service in services:
-            try:
-                image_url = service(query)
-                if image_url:
-                    if image_url.startswith("http"):
-                        # Download and save external images
-                        response = requests.get(image_url, timeout=10)
-                        response.raise_for_status()
-                        with open(full_path, "wb") as f:
-                            f.write(response.content)
-                    else:
-                        # Use local images directly
-                        return url_for('static', filename=image_url)
-                    
-                    return url_for('static', filename=filename)
-            except Exception as e:
-                print(f"Error with {service.__name__}: {str(e)}")
+        return _fetch_from(service, query, stop)
+    except Exception as e:
+        print(f"Error with {service.__name__}: {str(e)}")
+        return None
+
+def _race_providers(services, query, deadline):
+    # Fire every provider at once and keep the first usable result
+    stop = threading.Event()
+    futures = [image_executor.submit(_fetch_logged, service, query, stop) for service in services]
+    winner = None
+    end = time.monotonic() + deadline
+    pending = set(futures)
+    try:
+        while pending:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                print(f"Image providers missed the {deadline}s deadline for '{query}'")
+                return None
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result:
+                    winner = future
+                    return result
+        return None
+    finally:
+        # Providers already in flight finish their API call in the background,
+        # skip the download and are discarded
+        stop.set()
+        for future in futures:
+            if future is not winner:
+                future.cancel()
+                future.add_done_callback(_discard_result)
+
+def _sequential_providers(services, query):
+    for service in services:
+        result = _fetch_logged(service, query)
+        if result:
+            return result
+    return None
+
+FALLBACK_IMAGE = 'images/fallback/general.jpg'
+
+def _local_image(query):
+    with metrics.span('image', 'local'):
+        return local_images.match(query) or FALLBACK_IMAGE
+
+def _store_image(query, download):
+    # Resize/recompress into responsive variants when Pillow is available
+    processed = image_pipeline.process(download.path)
+    if not processed:
+        filename = image_cache.put_file(query, download)
+        local_images.add(f'generated/{filename}', query)
+        return filename
+    downloads.discard(download.path)
+    primary, variants = processed
+    filename = image_cache.put(query, primary['data'], primary['ext'], variants, primary['width'])
+    local_images.add(f'generated/{filename}', query)
+    return filename
 
-        # Ultimate fallback
-        return url_for('static', filename='images/fallback/general.jpg')
+def _image_variants(query):
+    entry = image_cache.get_entry(query)
+    return sorted(entry.get('variants', []), key=lambda v: v['width']) if entry else []
+
+def image_srcset(query, fmt='webp'):
+    # For <picture>: a WebP <source> plus the JPEG srcset on the <img>
+    return ', '.join(
+        f"{url_for('static', filename='generated/' + v['file'])} {v['width']}w"
+        for v in _image_variants(query) if v['format'] == fmt
+    )
+
+def background_image_sets(query):
+    # [(max viewport width or None, CSS image-set())] for a full-width
+    # background, widest first: media queries give small screens a small
+    # file and type() lets the browser pick WebP over JPEG
+    by_width = {}
+    for variant in _image_variants(query):
+        if variant['format'] in image_pipeline.MIME_TYPES:
+            by_width.setdefault(variant['width'], []).append(variant)
+    order = list(image_pipeline.MIME_TYPES)
+    rules = []
+    for index, width in enumerate(sorted(by_width, reverse=True)):
+        options = sorted(by_width[width], key=lambda v: order.index(v['format']))
+        value = 'image-set(' + ', '.join(
+            f"url(\"{url_for('static', filename='generated/' + v['file'])}\") "
+            f"type(\"{image_pipeline.MIME_TYPES[v['format']]}\")" for v in options) + ')'
+        rules.append((None if index == 0 else width, value))
+    return rules
+
+def image_sources(query):
+    # Everything a client needs to swap in a responsive image
+    sets = background_image_sets(query)
+    return {'srcset': image_srcset(query), 'fallback_srcset': image_srcset(query, 'jpg'),
+            'background': sets[0][1] if sets else ''}
+
+def _fetch_image(query):
+    # One round of the providers, bypassing the cache: a Download, a static
+    # path for local images, or None. Raises Overloaded when the AI gate is full
+    os.makedirs("static/images/fallback", exist_ok=True)
+
+    # Try external services
+    services = [
+        _try_stability_ai,
+        _try_dalle,
+        _try_pexels,
+        _try_unsplash
+    ]
+    random.shuffle(services)
+
+    with ai_gate.slot():
+        if IMAGE_PROVIDER_MODE == 'race':
+            return _race_providers(services, query, IMAGE_DEADLINE)
+        return _sequential_providers(services, query)
+
+def _resolve_image_path(query):
+    # Static-relative path for the query; safe to call outside a request
+    try:
+        # Serve repeat queries straight from the cache
+        cached = image_cache.get(query)
+        if cached:
+            return f'generated/{cached}'
+
+        if IMAGE_OFFLINE:
+            # No outbound calls: best keyword match among images already on disk
+            return _local_image(query)
+
+        try:
+            result = _fetch_image(query)
+        except Overloaded:
+            # Too many generations in flight: shed to an image already on disk
+            return _local_image(query)
+
+        if isinstance(result, downloads.Download):
+            return f'generated/{_store_image(query, result)}'
+        if result:
+            # Use local images directly
+            return result
+
+        # Closest local image, then the generic fallback
+        return _local_image(query)
         
     except Exception as e:
         print(f"Image Generation Error: {str(e)}")
-        return url_for('static', filename='images/fallback/general.jpg')
+        return FALLBACK_IMAGE
+
+def generate_ai_image(query):
+    return url_for('static', filename=_resolve_image_path(query))
+
+# Deferred images: pages render with the fallback and swap in the real image later
+image_background = ThreadPoolExecutor(max_workers=int(os.getenv('IMAGE_BACKGROUND_WORKERS', 4)),
+                                      thread_name_prefix='image-background')
+_image_jobs_lock = threading.Lock()
+_image_jobs = {}  # normalized query -> Future resolving to a static path
+IMAGE_JOBS_MAX = int(os.getenv('IMAGE_JOBS_MAX', 256))
+
+def _schedule_image(query, executor=None):
+    # Returns the job resolving `query`, or None when too many are pending
+    key = normalize_query(query)
+    with _image_jobs_lock:
+        job = _image_jobs.get(key)
+        if job is None:
+            if len(_image_jobs) >= IMAGE_JOBS_MAX:
+                # Finished jobs nobody polled again only hold a path
+                for stale in [k for k, j in _image_jobs.items() if j.done()]:
+                    del _image_jobs[stale]
+                if len(_image_jobs) >= IMAGE_JOBS_MAX:
+                    return None
+            job = (executor or image_background).submit(_resolve_image_path, query)
+            _image_jobs[key] = job
+        return job
+
+def _image_status(query, schedule=True):
+    # (ready, static path); `schedule=False` only reports on work already
+    # queued, so polling can't start new generations
+    cached = image_cache.get(query)
+    if cached:
+        return True, f'generated/{cached}'
+    if IMAGE_OFFLINE:
+        # Local lookups are cheap enough to resolve inline
+        return True, _local_image(query)
+    key = normalize_query(query)
+    with _image_jobs_lock:
+        job = _image_jobs.get(key)
+    if job is not None and job.done():
+        with _image_jobs_lock:
+            _image_jobs.pop(key, None)
+        return True, job.result()
+    if job is None and (not schedule or _schedule_image(query) is None):
+        # Nothing in flight for it: settle for the closest image on disk
+        return True, _local_image(query)
+    return False, FALLBACK_IMAGE
+
+def deferred_image(query):
+    _, path = _image_status(query)
+    return url_for('static', filename=path)
+
+def resolve_images(queries):
+    # Batch lookup: cache hits come back ready, misses resolve concurrently on
+    # the background pool and can be collected later via /api/image-status
+    return {query: _image_status(query) for query in dict.fromkeys(queries)}
+
+# Fixed queries every page render asks for: resolved at startup and rotated
+# in the background so no request waits on a provider for them
+PAGE_IMAGE_QUERIES = (
+    "fitness gym workout professional photography",  # base.html header
+    "fitness motivation",
+    "gym equipment",
+    "workout music",
+    "fitness podcast",
+    "fitness chatbot",
+    "personalized workout",
+    "fitness progress tracking",
+    # Home page feature cards (fetched through /api/get-image)
+    "strength training",
+    "healthy nutrition",
+    "fitness analytics",
+)
+IMAGE_PREWARM = os.getenv('IMAGE_PREWARM', '1') == '1'
+IMAGE_PREWARM_WORKERS = int(os.getenv('IMAGE_PREWARM_WORKERS', 8))
+IMAGE_PREWARM_TIMEOUT = float(os.getenv('IMAGE_PREWARM_TIMEOUT', 30))
+IMAGE_REFRESH_INTERVAL = float(os.getenv('IMAGE_REFRESH_INTERVAL', 3600))  # seconds per rotation step; 0 disables
+startup_report = {}
+
+def prewarm_images(queries=PAGE_IMAGE_QUERIES, timeout=IMAGE_PREWARM_TIMEOUT):
+    # Resolves every query in parallel; renders arriving meanwhile join the
+    # same jobs instead of starting their own
+    start = time.perf_counter()
+    counts = {'cached': 0, 'generated': 0, 'local': 0, 'pending': 0}
+    pool = ThreadPoolExecutor(max_workers=IMAGE_PREWARM_WORKERS, thread_name_prefix='image-prewarm')
+    jobs = {}
+    for query in queries:
+        if image_cache.get(query):
+            counts['cached'] += 1
+        elif IMAGE_OFFLINE:
+            _local_image(query)  # warms the keyword index memo
+            counts['local'] += 1
+        else:
+            job = _schedule_image(query, pool)
+            if job is None:
+                _local_image(query)
+                counts['local'] += 1
+            else:
+                jobs[query] = job
+    _, pending = wait(jobs.values(), timeout=timeout)
+    for query, job in jobs.items():
+        if job in pending:
+            counts['pending'] += 1
+            continue
+        with _image_jobs_lock:
+            if _image_jobs.get(normalize_query(query)) is job:
+                del _image_jobs[normalize_query(query)]
+        counts['generated' if image_cache.get(query) else 'local'] += 1
+    pool.shutdown(wait=False)
+    return dict(counts, queries=len(queries), seconds=round(time.perf_counter() - start, 3))
+
+def refresh_page_image(queries=PAGE_IMAGE_QUERIES):
+    # Regenerates the page image that has gone longest without a refresh;
+    # the current one keeps serving until its replacement is stored
+    created = {query: (image_cache.get_entry(query) or {}).get('created', 0) for query in queries}
+    query = min(queries, key=created.get)
+    try:
+        result = _fetch_image(query)
+    except Overloaded:
+        return None  # busy with user traffic; try again next round
+    if isinstance(result, downloads.Download):
+        _store_image(query, result)
+        return query
+    return None
+
+IMAGE_REFRESH_LOCK = os.path.join(app.instance_path, 'image_refresh.lock')
+
+def _refresh_images(interval):
+    # Every worker runs this loop but only the one holding the lock file
+    # refreshes, so providers see one regeneration per interval per host.
+    # If that worker exits, the next one to wake up takes over.
+    leader = None
+    while True:
+        time.sleep(interval)
+        if leader is None:
+            leader = try_lock(IMAGE_REFRESH_LOCK)
+            if leader is None:
+                continue
+        try:
+            refreshed = refresh_page_image()
+            if refreshed:
+                print(f"Refreshed page image for '{refreshed}'")
+        except Exception as e:
+            print(f"Image refresh error: {str(e)}")
+
+def warm_start():
+    # Prewarms the page images, reports cold start and starts the refresher
+    prewarm = prewarm_images()
+    startup_report['prewarm'] = prewarm
+    startup_report['ready_seconds'] = round(time.perf_counter() - STARTED, 3)
+    if metrics.ENABLED:
+        metrics.registry.set('primalfit_startup_seconds', startup_report['import_seconds'], phase='import')
+        metrics.registry.set('primalfit_startup_seconds', prewarm['seconds'], phase='prewarm')
+    print(f"Cold start: app imported in {startup_report['import_seconds']}s, "
+          f"{prewarm['queries']} page images prewarmed in {prewarm['seconds']}s "
+          f"({prewarm['cached']} cached, {prewarm['generated']} generated, {prewarm['local']} local, "
+          f"{prewarm['pending']} pending)")
+    if IMAGE_REFRESH_INTERVAL > 0 and not IMAGE_OFFLINE:
+        threading.Thread(target=_refresh_images, args=(IMAGE_REFRESH_INTERVAL,),
+                         name='image-refresh', daemon=True).start()
+
+IMAGE_ORPHAN_GRACE = float(os.getenv('IMAGE_ORPHAN_GRACE', 3600))
+_started_pid = None
+_started_lock = threading.Lock()
+
+@app.before_request
+def _start_background_work():
+    # Once per worker process, on its first request: works under any server,
+    # threads started before a pre-fork server forks wouldn't survive, and the
+    # debug reloader's watcher process never gets here
+    global _started_pid
+    if _started_pid == os.getpid():
+        return
+    with _started_lock:
+        if _started_pid == os.getpid():
+            return
+        # Offline mode keeps legacy generated images around as local matches.
+        # The sweep checks the shared on-disk index and leaves recent files
+        # alone, so workers starting or recycling at any time are safe.
+        if not IMAGE_OFFLINE:
+            removed = image_cache.remove_orphans(grace=IMAGE_ORPHAN_GRACE)
+            if removed:
+                print(f"Removed {removed} orphaned generated images")
+        if IMAGE_PREWARM:
+            threading.Thread(target=warm_start, name='warm-start', daemon=True).start()
+        _started_pid = os.getpid()
 
 # Update the Stability AI function
 def _try_stability_ai(query):
     if not STABILITY_API_KEY: return None
     url = "https://api.stability.ai/v2beta/stable-image/generate/core"
-    headers = {"Authorization": f"Bearer {STABILITY_API_KEY}"}
+    headers = {"Authorization": f"Bearer {STABILITY_API_KEY}", "Accept": "image/*"}
     
     files = {
         "prompt": (None, query),
@@ -131,9 +693,11 @@ def _try_stability_ai(query):
     }
 
     try:
-        response = requests.post(url, headers=headers, files=files, timeout=20)
+        # Generation is billed per call and races a deadline: never resend it
+        response = http.post('stability', url, headers=headers, files=files, stream=True, timeout=(3.05, 20),
+                             retries=0)
         response.raise_for_status()
-        return response.content  # Return binary content instead of saving here
+        return response  # Streamed to disk by the download stage
     except Exception as e:
         print(f"Stability AI Error: {str(e)}")
         return None
@@ -153,7 +717,7 @@ def _try_dalle(query):
         "quality": "standard"
     }
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=10)
+        response = http.post('openai', url, headers=headers, json=data, timeout=(3.05, 10), retries=0)
         response.raise_for_status()
         return response.json()['data'][0]['url']
     except Exception as e:
@@ -164,9 +728,13 @@ def _try_pexels(query):
     if not PEXELS_API_KEY: return None
     url = f"https://api.pexels.com/v1/search?query={query}&per_page=1"
     headers = {"Authorization": PEXELS_API_KEY}
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    return response.json()['photos'][0]['src']['large']
+    try:
+        response = http.get('pexels', url, headers=headers, timeout=(3.05, 5))
+        response.raise_for_status()
+        return response.json()['photos'][0]['src']['large']
+    except Exception as e:
+        print(f"Pexels Error: {str(e)}")
+        return None
 
 def _try_unsplash(query):
     if not UNSPLASH_ACCESS_KEY: return None
@@ -177,7 +745,7 @@ def _try_unsplash(query):
         "orientation": "landscape"
     }
     try:
-        response = requests.get(url, params=params, timeout=5)
+        response = http.get('unsplash', url, params=params, timeout=(3.05, 5))
         response.raise_for_status()
         return response.json()['urls']['regular']
     except Exception as e:
@@ -185,92 +753,61 @@ def _try_unsplash(query):
         return None
 
 def get_ai_adaptation(prompt):
-    headers = {"Authorization": f"Bearer {GROQ_API_KEY}"}
-    data = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.7,
-        "max_tokens": 500
-    }
-    
-    response = requests.post(
-        "https://api.groq.com/openai/v1/chat/completions",
-        headers=headers,
-        json=data
-    )
-    return response.json()['choices'][0]['message']['content']
+    return llm.complete([{"role": "user", "content": prompt}], CHAT_MAX_TOKENS)
 
 def parse_ai_response(text):
-    # Add error handling and default structure
-    try:
-        exercises = []
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        
-        current_exercise = {}
-        for line in lines:
-            if line.lower().startswith('exercise:'):
-                if current_exercise:
-                    exercises.append(current_exercise)
-                current_exercise = {
-                    'name': line.split(': ')[1],
-                    'type': 'General',
-                    'sets': '3',
-                    'reps': '10-12',
-                    'intensity': 60
-                }
-            elif line.lower().startswith('type:'):
-                current_exercise['type'] = line.split(': ')[1]
-            elif line.lower().startswith('sets:'):
-                current_exercise['sets'] = line.split(': ')[1]
-            elif line.lower().startswith('reps/duration:'):
-                current_exercise['reps'] = line.split(': ')[1]
-            elif line.lower().startswith('intensity:'):
-                current_exercise['intensity'] = int(line.split(': ')[1].replace('%', ''))
-
-        if current_exercise:
-            exercises.append(current_exercise)
-
+    # Adaptation replies use "Exercise:/Type:/Sets:/Reps/Duration:/Intensity:" blocks
+    exercises = []
+    for exercise in plan_parser.parse_workout(text or '')['exercises']:
+        intensity = re.search(r'\d+', exercise.get('intensity', ''))
+        exercises.append({
+            'name': exercise['name'],
+            'type': exercise.get('type') or exercise['muscle_group'] or 'General',
+            'sets': exercise['sets'] or '3',
+            'reps': exercise['reps'] or '10-12',
+            'intensity': int(intensity.group()) if intensity else 60
+        })
+    if exercises:
         return {
             'workout': {'exercises': exercises},
             'adaptations': {'feedback': 'Great start! Focus on maintaining proper form.'}
         }
-    except Exception as e:
-        # Return default workout structure if parsing fails
-        return {
-            'workout': {
-                'exercises': [{
-                    'name': 'Bodyweight Squats',
-                    'type': 'Strength',
-                    'sets': '3',
-                    'reps': '12-15',
-                    'intensity': 60,
-                    'image': generate_ai_image("bodyweight squats proper form")
-                }]
-            },
-            'adaptations': {'feedback': 'Default workout generated - focus on perfecting form!'}
-        }
+    # Return default workout structure if nothing could be parsed
+    return {
+        'workout': {
+            'exercises': [{
+                'name': 'Bodyweight Squats',
+                'type': 'Strength',
+                'sets': '3',
+                'reps': '12-15',
+                'intensity': 60,
+                'image': generate_ai_image("bodyweight squats proper form")
+            }]
+        },
+        'adaptations': {'feedback': 'Default workout generated - focus on perfecting form!'}
+    }
 
 # Context processor to make function available in templates
 @app.context_processor
 def inject_ai_functions():
-    return dict(generate_ai_image=generate_ai_image)
+    return dict(generate_ai_image=generate_ai_image, deferred_image=deferred_image, image_srcset=image_srcset,
+                background_image_sets=background_image_sets)
 
 # Routes
 @app.route('/')
 @login_required
 def home():
     return render_template('index.html',
-                         hero_image=generate_ai_image("fitness motivation"),
-                         about_image=generate_ai_image("gym equipment"),
-                         music_image=generate_ai_image("workout music"),
-                         podcast_image=generate_ai_image("fitness podcast"))
+                         hero_image=deferred_image("fitness motivation"),
+                         about_image=deferred_image("gym equipment"),
+                         music_image=deferred_image("workout music"),
+                         podcast_image=deferred_image("fitness podcast"))
 
 @app.route('/chatbot')
 def chatbot():
-    if "messages" not in session:
-        session["messages"] = BASE_PROMPT.copy()
+    conversation_id()
     return render_template('chatbot.html',
-                         chatbot_image=generate_ai_image("fitness chatbot"))
+                         chatbot_image=deferred_image("fitness chatbot"))
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -308,6 +845,9 @@ def login():
         
         if user and check_password_hash(user.password, password):
             login_user(user)
+            user_cache.put(CachedUser.from_model(user))
+            if USER_SESSION_IDENTITY:
+                remember_identity(user)
             return redirect(url_for('home'))
         
         flash('Invalid credentials!')
@@ -316,6 +856,7 @@ def login():
 @app.route('/logout')
 @login_required
 def logout():
+    session.pop('identity', None)
     logout_user()
     return redirect(url_for('login'))
 
@@ -327,46 +868,103 @@ def terms():
 def privacy():
     return render_template('privacy.html')
 
+# Chat history lives in the database so any worker can serve the next turn
+conversations = SQLConversationStore(
+    db.session,
+    ChatConversation,
+    idle_ttl=int(os.getenv('CHAT_IDLE_TTL', 24 * 3600)),
+    token_budget=int(os.getenv('CHAT_TOKEN_BUDGET', 1500)),
+    summary_chars=int(os.getenv('CHAT_SUMMARY_CHARS', 800))
+)
+
+def conversation_id():
+    # Drop histories left in the cookie by older versions
+    session.pop("messages", None)
+    if "chat_id" not in session:
+        session["chat_id"] = uuid.uuid4().hex
+    return session["chat_id"]
+
+def client_id():
+    if current_user.is_authenticated:
+        return f"user:{current_user.id}"
+    return f"ip:{request.remote_addr}"
+
+def too_many_requests(message, retry_after, rule, reason):
+    if metrics.ENABLED:
+        metrics.registry.inc('primalfit_rejected_total', rule=rule, reason=reason)
+    response = jsonify({"error": message})
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, 429
+
+def rate_limited(rule, ai=False):
+    # Token bucket per client and rule; `ai` views are also turned away up
+    # front while every outbound AI slot is taken
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            retry_after = rate_limiter.check(rule, client_id())
+            if retry_after:
+                return too_many_requests("Too many requests, please slow down", retry_after, rule, 'rate')
+            if ai and ai_gate.saturated():
+                return too_many_requests("Server is busy, try again shortly", ai_gate.retry_after, rule, 'busy')
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@app.errorhandler(Overloaded)
+def overloaded(e):
+    return too_many_requests(str(e), e.retry_after, request.endpoint or '', 'busy')
+
 # API Endpoints
 @app.route('/api/chat', methods=['POST'])
+@rate_limited('chat', ai=True)
 def chat():
-    if "messages" not in session:
-        session["messages"] = BASE_PROMPT.copy()
+    chat_id = conversation_id()
     
     user_message = request.json.get('message', '')
-    session["messages"].append({"role": "user", "content": user_message})
-    
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": session["messages"],
-        "temperature": 0.7,
-        "max_tokens": 500
-    }
+    conversations.append(chat_id, "user", user_message)
     
     try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json=payload
-        )
-        response.raise_for_status()
-        ai_response = clean_response(response.json()['choices'][0]['message']['content'])
+        ai_response = clean_response(llm.complete(conversations.messages(chat_id, BASE_PROMPT), CHAT_MAX_TOKENS))
+    except Overloaded:
+        raise
     except Exception as e:
         ai_response = f"Sorry, I encountered an error: {str(e)}"
     
-    session["messages"].append({"role": "assistant", "content": ai_response})
-    session.modified = True
+    conversations.append(chat_id, "assistant", ai_response)
     
     return jsonify({
         "response": f'<span style="color: white;">{ai_response}</span>',
-        "image": generate_ai_image(user_message) if "workout" in user_message.lower() else None
+        # Never waits on providers: a miss gets the fallback while it generates in the background
+        "image": deferred_image(user_message) if "workout" in user_message.lower() else None
     })
 
+@app.route('/api/chat/stream', methods=['POST'])
+@rate_limited('chat', ai=True)
+def chat_stream():
+    chat_id = conversation_id()
+    user_message = request.json.get('message', '')
+    # A full gate is a 429 here, before the turn is stored or streaming starts
+    slot = llm.reserve()
+    conversations.append(chat_id, "user", user_message)
+    messages = conversations.messages(chat_id, BASE_PROMPT)
+    image = deferred_image(user_message) if "workout" in user_message.lower() else None
+
+    def events():
+        parts = []
+        try:
+            for text in stream_cleaned(llm.stream(messages, CHAT_MAX_TOKENS, slot=slot)):
+                parts.append(text)
+                yield sse_event('token', {"text": text})
+        except Exception as e:
+            # The error is shown, not kept as something the assistant said
+            yield sse_event('error', {"error": f"Sorry, I encountered an error: {str(e)}"})
+        if parts:
+            conversations.append(chat_id, "assistant", ''.join(parts))
+        yield sse_event('done', {"image": image})
+
+    return sse_response(events(), slot)
+
 @app.route('/api/voice', methods=['POST'])
 def handle_voice():
     if 'audio' not in request.files:
@@ -387,19 +985,64 @@ def handle_voice():
 
 @app.route('/api/clear_chat', methods=['POST'])
 def clear_chat():
-    session["messages"] = BASE_PROMPT.copy()
-    session.modified = True
+    conversations.clear(conversation_id())
     return jsonify({"status": "success"})
 
 @app.route('/api/get-image')
+@rate_limited('image')
 def get_image():
     try:
         query = request.args.get('query', 'fitness')
         image_url = generate_ai_image(query)
-        return jsonify({'url': image_url})
+        return jsonify(dict(image_sources(query), url=image_url))
     except Exception as e:
         print(f"Image API Error: {str(e)}")
-        return jsonify({'url': url_for('static', filename='images/fallback/general.jpg')})
+        return jsonify({'url': url_for('static', filename=FALLBACK_IMAGE)})
+
+@app.route('/api/image-status')
+@rate_limited('image')
+def image_status():
+    images = {}
+    for query in request.args.getlist('query')[:20]:
+        ready, path = _image_status(query, schedule=False)
+        images[query] = dict(image_sources(query) if ready else {}, ready=ready,
+                             url=url_for('static', filename=path))
+    return jsonify({'images': images})
+
+@app.route('/api/cache-stats')
+@login_required
+def cache_stats():
+    return jsonify({
+        'plans': plan_cache.stats(),
+        'images': image_cache.stats(),
+        'local_images': local_images.stats(),
+        'rate_limits': rate_limiter.stats(),
+        'ai_calls': ai_gate.stats(),
+        'startup': startup_report
+    })
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not metrics.ENABLED or not (METRICS_TOKEN or METRICS_PUBLIC):
+        abort(404)
+    if METRICS_TOKEN and not hmac.compare_digest(request.headers.get('Authorization', ''),
+                                                 f'Bearer {METRICS_TOKEN}'):
+        abort(401)
+    registry = metrics.registry
+    states = {'closed': 0, 'half-open': 1, 'open': 2}
+    for provider, breaker in http.stats()['breakers'].items():
+        registry.set('primalfit_circuit_state', states.get(breaker['state'], 0), provider=provider)
+    for name, stats in (('plans', plan_cache.stats()), ('users', user_cache.stats())):
+        registry.set('primalfit_cache_entries', stats['entries'], cache=name)
+        registry.set('primalfit_cache_hits', stats['hits'], cache=name)
+        registry.set('primalfit_cache_misses', stats['misses'], cache=name)
+    images = image_cache.stats()
+    registry.set('primalfit_cache_entries', images['entries'], cache='images')
+    registry.set('primalfit_image_cache_bytes', images['bytes'])
+    for status, count in plan_jobs.stats()['jobs'].items():
+        registry.set('primalfit_jobs', count, status=status)
+    registry.set('primalfit_ai_calls_in_flight', ai_gate.active)
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/contact', methods=['GET', 'POST'])
 def contact():
@@ -421,99 +1064,150 @@ def contact():
 def nutrition():
     return render_template('nutrition.html')
 
+NUTRITION_FIELDS = ['weight', 'height', 'calories', 'diet_type']
+
+# Plan completions are cached on their normalized, bucketed parameters
+def _parse_buckets(spec):
+    return {field: float(size) for field, size in
+            (part.split('=') for part in spec.split(',') if '=' in part)}
+
+plan_cache = CompletionCache(
+    max_entries=int(os.getenv('PLAN_CACHE_MAX_ENTRIES', 500)),
+    ttl=int(os.getenv('PLAN_CACHE_TTL', 24 * 3600))
+)
+NUTRITION_BUCKETS = _parse_buckets(os.getenv('NUTRITION_CACHE_BUCKETS', 'weight=5,height=5,calories=100'))
+WORKOUT_BUCKETS = _parse_buckets(os.getenv('WORKOUT_CACHE_BUCKETS', 'weekly_sessions=1'))
+
+nutrition_engine = NutritionEngine()
+
+def nutrition_cache_key(data):
+    # Keys the LLM tips; the plan itself is cheap enough to rebuild
+    params = {field: data.get(field) for field in NUTRITION_FIELDS + ['allergies', 'custom_prompt']}
+    return plan_key('nutrition_tips', params, NUTRITION_BUCKETS, lists=('allergies',))
+
+def workout_cache_key(data):
+    params = {field: data.get(field) for field in WORKOUT_FIELDS}
+    return plan_key('workout', params, WORKOUT_BUCKETS, lists=('available_equipment',))
+
+def local_nutrition_plan(data):
+    return nutrition_engine.plan(
+        float(data['weight']),
+        float(data['height']),
+        calories=data.get('calories'),
+        diet_type=data.get('diet_type'),
+        allergies=data.get('allergies'),
+        age=data.get('age') or getattr(current_user, 'age', None),
+        sex=data.get('sex'),
+        activity=data.get('activity_level')
+    )
+
+def nutrition_tips_prompt(data, plan):
+    targets = plan['targets']
+    return f"""Give 3 short, practical tips for someone eating {targets['calories']} kcal a day on a {targets['diet_type']} diet.
+        - BMI: {plan['bmi']['value']}
+        - Restrictions: {data.get('allergies') or 'none'}
+        - Special Instructions: {data.get('custom_prompt') or 'none'}
+
+        One tip per line, no headings, no numbering, no preamble."""
+
+def tip_lines(text):
+    return [tip for tip in (plan_parser.strip_bullet(line) for line in text.split('\n')) if tip]
+
+def nutrition_tips(data, plan):
+    # Tips are optional: a slow or failing LLM leaves the local plan as is
+    if not NUTRITION_TIPS:
+        return []
+    cache_key = nutrition_cache_key(data)
+    tips = plan_cache.get(cache_key)
+    if tips is None:
+        try:
+            prompt = nutrition_tips_prompt(data, plan)
+            tips = clean_response(llm.complete([{"role": "user", "content": prompt}], TIPS_MAX_TOKENS,
+                                               timeout=TIPS_TIMEOUT, retries=0))
+        except Exception as e:
+            print(f"Nutrition tips error: {str(e)}")
+            return []
+        plan_cache.put(cache_key, tips)
+    return tip_lines(tips)
+
+def build_nutrition_plan(data):
+    plan = local_nutrition_plan(data)
+    plan['prep'].extend(nutrition_tips(data, plan))
+    bmi = plan['bmi']['value']
+
+    return {
+        "plan": render_nutrition_plan(plan),
+        "structured": plan,
+        "bmi": bmi,
+        "bmi_note": get_bmi_note(bmi) if bmi else ""
+    }
+
 @app.route('/api/generate-nutrition-plan', methods=['POST'])
 @login_required
+@rate_limited('nutrition')
 def generate_nutrition_plan():
     try:
         data = request.json
-        required_fields = ['weight', 'height', 'calories', 'diet_type']
-        if not all(field in data for field in required_fields):
+        if not all(field in data for field in NUTRITION_FIELDS):
             return jsonify({"error": "Missing required fields"}), 400
 
-        prompt = f"""Create a detailed nutrition plan with these specifications:
-        - Weight: {data['weight']} kg
-        - Height: {data['height']} cm
-        - Target Calories: {data['calories']}
-        - Diet Type: {data['diet_type'].capitalize()}
-        - Restrictions: {data.get('allergies', 'none')}
-        - Special Instructions: {data.get('custom_prompt', 'none')}
-
-        Format with these exact section headers:
-        [BMI Analysis] (Just the calculated BMI number and classification and some information/motivation in a sentence)
-        [Macronutrients] (Protein/Carbs/Fats percentages only)
-        [Daily Meal Plan] (Breakfast/Lunch/Dinner/Snacks)
-        [Weekly Diet Plan] (7-day meal overview)
-        [Grocery List] (Bulleted list)
-        [Prep Tips] (Numbered steps, also include ways to better diet, for eg: water intake, workouts etc.)
-
-        Exclude formulas and explanations. Use clear bullet points."""
-
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        return jsonify(build_nutrition_plan(data))
 
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json={
-                "model": "llama-3.3-70b-versatile",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.7,
-                "max_tokens": 1500
-            }
-        )
-        response.raise_for_status()
-
-        raw_content = response.json()['choices'][0]['message']['content']
-        cleaned_plan = clean_response(raw_content)
-        bmi = calculate_bmi(float(data['weight']), float(data['height']))
-
-        return jsonify({
-            "plan": cleaned_plan,
-            "bmi": bmi,
-            "bmi_note": get_bmi_note(bmi) if bmi else ""
-        })
-
-    except requests.exceptions.RequestException as e:
-        return jsonify({"error": f"AI API Error: {str(e)}"}), 502
     except Exception as e:
         return jsonify({"error": f"Server Error: {str(e)}"}), 500
 
-def get_bmi_note(bmi):
-    if bmi < 18.5:
-        return "Underweight - Consider increasing calorie intake"
-    elif 18.5 <= bmi < 25:
-        return "Healthy weight - Maintain your balance"
-    elif 25 <= bmi < 30:
-        return "Overweight - Consider gradual weight loss"
-    else:
-        return "Obese - Consult a healthcare professional"
-
-def calculate_bmi(weight, height):
+@app.route('/api/generate-nutrition-plan/stream', methods=['POST'])
+@login_required
+@rate_limited('nutrition')
+def generate_nutrition_plan_stream():
+    data = request.json
+    if not data or not all(field in data for field in NUTRITION_FIELDS):
+        return jsonify({"error": "Missing required fields"}), 400
     try:
-        height_m = height / 100
-        return round(weight / (height_m ** 2), 1)
-    except ZeroDivisionError:
-        return None
+        plan = local_nutrition_plan(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Server Error: {str(e)}"}), 400
+    bmi = plan['bmi']['value']
+    cache_key = nutrition_cache_key(data)
+    cached_tips = plan_cache.get(cache_key) if NUTRITION_TIPS else None
+
+    def events():
+        # The whole local plan goes out at once; only the tips stream
+        yield sse_event('meta', {"bmi": bmi, "bmi_note": get_bmi_note(bmi) if bmi else ""})
+        yield sse_event('token', {"text": render_nutrition_plan(plan)})
+        if cached_tips is not None:
+            tips = cached_tips
+            yield sse_event('token', {"text": '\n' + tips})
+        elif NUTRITION_TIPS:
+            parts = []
+            try:
+                prompt = nutrition_tips_prompt(data, plan)
+                for text in stream_cleaned(llm.stream([{"role": "user", "content": prompt}], TIPS_MAX_TOKENS,
+                                                           timeout=TIPS_TIMEOUT, retries=0)):
+                    yield sse_event('token', {"text": ('\n' if not parts else '') + text})
+                    parts.append(text)
+                plan_cache.put(cache_key, ''.join(parts))
+            except Exception as e:
+                print(f"Nutrition tips error: {str(e)}")
+            tips = ''.join(parts)
+        else:
+            tips = ''
+        plan['prep'].extend(tip_lines(tips))
+        yield sse_event('done', {"cached": cached_tips is not None, "structured": plan})
+
+    return sse_response(events())
 
 @app.route('/workouts')
 @login_required
 def workouts():
     return render_template('workouts.html',
-                         workout_image=generate_ai_image("personalized workout"),
-                         progress_image=generate_ai_image("fitness progress tracking"))
+                         workout_image=deferred_image("personalized workout"),
+                         progress_image=deferred_image("fitness progress tracking"))
 
-@app.route('/api/generate-workout-plan', methods=['POST'])
-@login_required
-def generate_workout_plan():
-    try:
-        data = request.json
-        required_fields = ['fitness_level', 'workout_type', 'available_equipment', 'weekly_sessions']
-        if not all(field in data for field in required_fields):
-            return jsonify({"error": "Missing required fields"}), 400
+WORKOUT_FIELDS = ['fitness_level', 'workout_type', 'available_equipment', 'weekly_sessions']
 
-        prompt = f"""Create a detailed workout plan with these parameters:
+def workout_prompt(data):
+    return f"""Create a detailed workout plan with these parameters:
         Fitness Level: {data['fitness_level']}
         Primary Goal: {data['workout_type']}
         Available Equipment: {data['available_equipment']}
@@ -533,42 +1227,308 @@ def generate_workout_plan():
         - Week 1: [Details]
         - Week 2: [Details]"""
 
-        headers = {"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"}
-        
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json={
-                "model": "llama-3.3-70b-versatile",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.7,
-                "max_tokens": 1500
-            }
-        )
-        response.raise_for_status()
+def canonical_exercise(name):
+    # "Push-ups", "Pushups" and "push-up" all map to "pushup"
+    words = re.sub(r'(?<=[a-z])-(?=[a-z])', '', name.lower())
+    words = re.findall(r'[a-z0-9]+', words)
+    if words and len(words[-1]) > 3 and words[-1].endswith('s') and not words[-1].endswith('ss'):
+        words[-1] = words[-1][:-1]
+    return ' '.join(words)
+
+def exercise_images_for(workout):
+    # `workout` is a plan_parser.parse_workout() result
+    exercises = plan_parser.exercise_names(workout)
+    queries = {}  # dedupe key -> image query
+    keys = {}     # client key -> dedupe key
+    for ex in exercises:
+        canonical = canonical_exercise(ex)
+        if not canonical:
+            continue
+        dedupe = canonical.replace(' ', '')
+        queries.setdefault(dedupe, f"{canonical} exercise proper form")
+        keys[ex.lower().replace(' ', '_')] = dedupe
 
-        raw_content = response.json()['choices'][0]['message']['content']
+    statuses = resolve_images(queries.values())
+    images, pending = {}, {}
+    for key, dedupe in keys.items():
+        query = queries[dedupe]
+        ready, path = statuses[query]
+        images[key] = url_for('static', filename=path)
+        if not ready:
+            pending[key] = query
+    return images, pending
+
+def build_workout_plan(data):
+    cache_key = workout_cache_key(data)
+    cleaned_plan = plan_cache.get(cache_key)
+    if cleaned_plan is None:
+        prompt = workout_prompt(data)
+        raw_content = llm.complete([{"role": "user", "content": prompt}], PLAN_MAX_TOKENS)
         cleaned_plan = clean_response(raw_content)
-        
-        # Extract exercise names for images
-        exercises = list(set(
-            re.findall(r'• (.*?):', cleaned_plan) +
-            re.findall(r'Day \d+: (.*)', cleaned_plan)[0].split(', ')
-        ))
-        exercise_images = {
-            ex.lower().replace(' ', '_'): generate_ai_image(f"{ex} exercise proper form")
-            for ex in exercises if ex
-        }
+        plan_cache.put(cache_key, cleaned_plan)
 
-        return jsonify({
-            "plan": cleaned_plan,
-            "exercise_images": exercise_images,
-            "status": "success"
-        })
+    workout = plan_parser.parse_workout(cleaned_plan)
+    exercise_images, pending_images = exercise_images_for(workout)
+
+    return {
+        "plan": cleaned_plan,
+        "structured": workout,
+        "exercise_images": exercise_images,
+        "pending_images": pending_images,
+        "status": "success"
+    }
+
+@app.route('/api/generate-workout-plan', methods=['POST'])
+@login_required
+@rate_limited('workout', ai=True)
+def generate_workout_plan():
+    try:
+        data = request.json
+        if not all(field in data for field in WORKOUT_FIELDS):
+            return jsonify({"error": "Missing required fields"}), 400
 
+        return jsonify(build_workout_plan(data))
+
+    except Overloaded:
+        raise
     except Exception as e:
         return jsonify({"error": str(e), "status": "error"}), 500
+
+@app.route('/api/generate-workout-plan/stream', methods=['POST'])
+@login_required
+@rate_limited('workout', ai=True)
+def generate_workout_plan_stream():
+    data = request.json
+    if not data or not all(field in data for field in WORKOUT_FIELDS):
+        return jsonify({"error": "Missing required fields", "status": "error"}), 400
+    prompt = workout_prompt(data)
+    cache_key = workout_cache_key(data)
+    cached_plan = plan_cache.get(cache_key)
+    # A full gate is a 429 here rather than an error event in a 200 stream
+    slot = llm.reserve() if cached_plan is None else None
+
+    def events():
+        parts = []
+        parser = plan_parser.WorkoutParser()
+        try:
+            if cached_plan is not None:
+                parts.append(cached_plan)
+                parser.feed(cached_plan)
+                yield sse_event('token', {"text": cached_plan})
+            else:
+                for text in stream_cleaned(llm.stream([{"role": "user", "content": prompt}], PLAN_MAX_TOKENS,
+                                                      slot=slot)):
+                    parts.append(text)
+                    parser.feed(text)
+                    yield sse_event('token', {"text": text})
+                plan_cache.put(cache_key, ''.join(parts))
+            workout = parser.finish()
+            images, pending = exercise_images_for(workout)
+        except Exception as e:
+            yield sse_event('error', {"error": str(e), "status": "error"})
+            return
+        yield sse_event('done', {"structured": workout, "exercise_images": images, "pending_images": pending,
+                                 "status": "success"})
+
+    return sse_response(events(), slot)
     
+# Background plan generation
+def _job_error(e):
+    if isinstance(e, requests.exceptions.RequestException):
+        return f"AI API Error: {str(e)}"
+    return str(e)
+
+plan_jobs = JobQueue(
+    workers=int(os.getenv('JOB_WORKERS', 4)),
+    per_user=int(os.getenv('JOB_PER_USER', 2)),
+    backlog=int(os.getenv('JOB_BACKLOG', 50)),
+    format_error=_job_error
+)
+
+JOB_KINDS = {
+    'nutrition-plan': (NUTRITION_FIELDS, build_nutrition_plan, 'nutrition'),
+    'workout-plan': (WORKOUT_FIELDS, build_workout_plan, 'workout'),
+}
+
+def _user_job(job_id):
+    job = plan_jobs.get(job_id)
+    if job is None or job.user_id != current_user.id:
+        abort(404)
+    return job
+
+@app.route('/api/jobs/<kind>', methods=['POST'])
+@login_required
+def submit_job(kind):
+    if kind not in JOB_KINDS:
+        abort(404)
+    fields, build, rule = JOB_KINDS[kind]
+    data = request.json
+    if not data or not all(field in data for field in fields):
+        return jsonify({"error": "Missing required fields"}), 400
+    # Queued jobs draw from the same buckets as the synchronous endpoints
+    retry_after = rate_limiter.check(rule, client_id())
+    if retry_after:
+        return too_many_requests("Too many requests, please slow down", retry_after, rule, 'rate')
+
+    try:
+        # The request context is copied so url_for keeps working in the worker
+        job = plan_jobs.submit(current_user.id, kind, copy_current_request_context(build), data)
+    except JobRejected as e:
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, e.status_code
+
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "url": url_for('job_status', job_id=job.id)
+    }), 202
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    return jsonify(_user_job(job_id).to_dict())
+
+@app.route('/api/jobs/<job_id>/events')
+@login_required
+def job_events(job_id):
+    job = _user_job(job_id)
+
+    def events():
+        status = None
+        deadline = time.monotonic() + 300
+        while time.monotonic() < deadline:
+            snapshot = plan_jobs.wait(job, timeout=15, seen_status=status)
+            if snapshot['status'] == status:
+                # Keep idle connections alive through proxies
+                yield ": keep-alive\n\n"
+                continue
+            status = snapshot['status']
+            yield sse_event('status', snapshot)
+            if status in ('done', 'error'):
+                return
+
+    return sse_response(events())
+
+# Progress analytics
+def update_rollups(entry, sign=1, pending=None):
+    # Called inside the same transaction as the Progress insert. Sums are
+    # incremented in SQL so concurrent writers for one user and period don't
+    # lose updates. Batch writers pass `pending` to collect the increments
+    # and apply them once with flush_rollups().
+    batch = {} if pending is None else pending
+    deltas = analytics.entry_deltas(entry, sign)
+    for period in analytics.PERIODS:
+        key = (entry.user_id, period, analytics.period_start(entry.date, period))
+        analytics.merge_deltas(batch.setdefault(key, {}), deltas)
+    if pending is None:
+        flush_rollups(batch)
+
+def flush_rollups(pending):
+    for (user_id, period, start), deltas in pending.items():
+        database.increment(db.session, ProgressRollup.__table__,
+                           {'user_id': user_id, 'period': period, 'period_start': start}, deltas)
+    pending.clear()
+
+def progress_summary(user_id):
+    rollups = {}
+    for period, window in analytics.WINDOWS.items():
+        recent = ProgressRollup.query.filter_by(user_id=user_id, period=period)\
+            .order_by(ProgressRollup.period_start.desc()).limit(window).all()
+        rollups[period] = list(reversed(recent))
+    return analytics.summarize(rollups, datetime.utcnow().date())
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups():
+    """Recompute every ProgressRollup from the raw Progress rows."""
+    ProgressRollup.query.delete()
+    rollups = {}
+    for entry in Progress.query.yield_per(500):
+        update_rollups(entry, 1, rollups)
+    flush_rollups(rollups)
+    db.session.commit()
+    print("Progress rollups rebuilt")
+
+@app.cli.command('build-assets')
+def build_assets():
+    """Fingerprint static files, precompress CSS/JS and write static/manifest.json."""
+    manifest, compressed = static_assets.build()
+    print(f"Fingerprinted {len(manifest)} static files, wrote {compressed} precompressed copies")
+
+@app.route('/api/progress/analytics')
+@login_required
+def progress_analytics():
+    return jsonify(progress_summary(current_user.id))
+
+PROGRESS_FIELDS = ['weight', 'body_fat', 'calories_consumed', 'calories_burned',
+                   'workout_duration', 'sleep_hours', 'sleep_quality']
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+@app.route('/api/progress')
+@login_required
+def progress_history():
+    try:
+        start = _parse_date(request.args.get('start'))
+        end = _parse_date(request.args.get('end'))
+        limit = min(max(int(request.args.get('limit', 100)), 1), 500)
+        points = int(request.args['points']) if request.args.get('points') else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if points is not None:
+        # LTTB keeps both endpoints plus one point per bucket, so needs at least 3
+        if points < 3:
+            return jsonify({"error": "points must be at least 3"}), 400
+        points = min(points, 1000)
+
+    query = Progress.query.filter(Progress.user_id == current_user.id)
+    if start:
+        query = query.filter(Progress.date >= start)
+    if end:
+        query = query.filter(Progress.date <= end)
+
+    if points:
+        # Downsample each metric across the whole range to at most `points` points
+        method = request.args.get('method', 'lttb')
+        fields = [m for m in request.args.get('metrics', ','.join(PROGRESS_FIELDS)).split(',')
+                  if m in PROGRESS_FIELDS]
+        columns = [Progress.date] + [getattr(Progress, m) for m in fields]
+        rows = query.with_entities(*columns).order_by(Progress.date, Progress.id).all()
+        series = {}
+        for index, metric in enumerate(fields, start=1):
+            values = [(row[0].toordinal(), row[index]) for row in rows if row[index] is not None]
+            series[metric] = [
+                {"date": datetime.fromordinal(round(x)).strftime('%Y-%m-%d'), "value": round(y, 2)}
+                for x, y in analytics.downsample(values, points, method)
+            ]
+        return jsonify({"total": len(rows), "method": method, "series": series})
+
+    # Keyset pagination on (date, id); the cursor is the last row seen
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            cursor_date, cursor_id = cursor.split(':')
+            cursor_date, cursor_id = _parse_date(cursor_date), int(cursor_id)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        query = query.filter(db.or_(
+            Progress.date > cursor_date,
+            db.and_(Progress.date == cursor_date, Progress.id > cursor_id)
+        ))
+    rows = query.order_by(Progress.date, Progress.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return jsonify({
+        "entries": [
+            dict({"id": row.id, "date": row.date.strftime('%Y-%m-%d')},
+                 **{field: getattr(row, field) for field in PROGRESS_FIELDS})
+            for row in rows
+        ],
+        "next_cursor": f"{rows[-1].date.strftime('%Y-%m-%d')}:{rows[-1].id}" if has_more else None
+    })
+
 @app.route('/aboutus')
 def aboutus():
     return render_template('aboutus.html')  
@@ -582,8 +1542,10 @@ def progress():
         'sleep_hours': 8  # Add sleep goal
     }
     
+    # Most recent 30 entries, oldest first for the charts
     progress_data = Progress.query.filter_by(user_id=current_user.id)\
-        .order_by(Progress.date.asc()).limit(30).all()
+        .order_by(Progress.date.desc(), Progress.id.desc()).limit(30).all()
+    progress_data.reverse()
     
     # Prepare chart data
     dates = [entry.date.strftime('%Y-%m-%d') for entry in progress_data]
@@ -601,7 +1563,8 @@ def progress():
                          calories_consumed=calories_consumed,
                          calories_burned=calories_burned,
                          sleep_hours=sleep_hours,
-                         sleep_quality=sleep_quality)
+                         sleep_quality=sleep_quality,
+                         analytics=progress_summary(current_user.id))
 
 @app.route('/api/submit-progress', methods=['POST'])
 @login_required
@@ -610,6 +1573,7 @@ def submit_progress():
         data = request.json
         new_entry = Progress(
             user_id=current_user.id,
+            date=datetime.utcnow().date(),
             weight=float(data['weight']),
             body_fat=float(data['body_fat']),
             calories_consumed=int(data['calories_consumed']),
@@ -619,14 +1583,162 @@ def submit_progress():
             sleep_quality=int(data.get('sleep_quality')) if data.get('sleep_quality') else None
         )
         db.session.add(new_entry)
+        update_rollups(new_entry)
         db.session.commit()
         return jsonify({"status": "success"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Bulk ingestion for wearable/CSV imports
+PROGRESS_TYPES = {
+    'weight': float,
+    'body_fat': float,
+    'calories_consumed': int,
+    'calories_burned': int,
+    'workout_duration': int,
+    'sleep_hours': float,
+    'sleep_quality': int
+}
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 500))
+BULK_MAX_ROWS = int(os.getenv('BULK_MAX_ROWS', 50000))
+NDJSON_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+def parse_progress_row(raw):
+    if not isinstance(raw, dict):
+        raise ValueError("Row must be an object")
+    try:
+        day = _parse_date(str(raw.get('date') or '').strip()[:10])
+    except ValueError:
+        raise ValueError(f"Invalid date: {raw.get('date')!r}")
+    if not day:
+        raise ValueError("Missing date")
+
+    values = {}
+    for field, kind in PROGRESS_TYPES.items():
+        value = raw.get(field)
+        if value is None or value == '':
+            continue
+        try:
+            value = int(float(value)) if kind is int else float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid {field}: {value!r}")
+        if value < 0:
+            raise ValueError(f"{field} must not be negative")
+        values[field] = value
+    if 'sleep_quality' in values and not 1 <= values['sleep_quality'] <= 5:
+        raise ValueError("sleep_quality must be between 1 and 5")
+    if not values:
+        raise ValueError("Row has no progress values")
+    return day, values
+
+def _bulk_rows():
+    # Yields raw rows (or the exception for an unparseable line) as they stream in
+    if request.mimetype == 'text/csv':
+        yield from csv.DictReader(io.TextIOWrapper(request.stream, encoding='utf-8', newline=''))
+    elif request.mimetype in NDJSON_TYPES:
+        for line in io.TextIOWrapper(request.stream, encoding='utf-8'):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield ValueError(f"Invalid JSON: {e}")
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, list):
+            raise ValueError("Expected a JSON array, CSV or NDJSON body")
+        yield from data
+
+def _ingest_batch(user_id, batch):
+    # Upsert on (user, date): a date that already has an entry updates the
+    # latest one with the supplied fields
+    days = {day for _, day, _ in batch}
+    existing = {}
+    for entry in Progress.query.filter(Progress.user_id == user_id, Progress.date.in_(days))\
+            .order_by(Progress.id):
+        existing[entry.date] = entry
+
+    inserted = updated = 0
+    rollups = {}
+    with db.session.no_autoflush:
+        for _, day, values in batch:
+            entry = existing.get(day)
+            if entry is None:
+                entry = Progress(user_id=user_id, date=day, **values)
+                db.session.add(entry)
+                existing[day] = entry
+                inserted += 1
+            else:
+                update_rollups(entry, -1, rollups)
+                for field, value in values.items():
+                    setattr(entry, field, value)
+                updated += 1
+            update_rollups(entry, 1, rollups)
+    flush_rollups(rollups)
+    db.session.commit()
+    return inserted, updated
+
+@app.route('/api/progress/bulk', methods=['POST'])
+@login_required
+def bulk_progress():
+    user_id = current_user.id
+    inserted = updated = 0
+    errors = []
+    batch = []
+
+    def flush():
+        nonlocal inserted, updated
+        try:
+            added, changed = _ingest_batch(user_id, batch)
+            inserted += added
+            updated += changed
+        except Exception as e:
+            db.session.rollback()
+            errors.extend({"row": row, "error": f"Batch failed: {str(e)}"} for row, _, _ in batch)
+        batch.clear()
+
+    try:
+        for row_number, raw in enumerate(_bulk_rows(), start=1):
+            if row_number > BULK_MAX_ROWS:
+                errors.append({"row": row_number, "error": f"Row limit of {BULK_MAX_ROWS} reached"})
+                break
+            try:
+                if isinstance(raw, Exception):
+                    raise raw
+                day, values = parse_progress_row(raw)
+            except ValueError as e:
+                errors.append({"row": row_number, "error": str(e)})
+                continue
+            batch.append((row_number, day, values))
+            if len(batch) >= BULK_BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        if batch:
+            flush()
+        errors.append({"row": None, "error": str(e)})
+
+    if not errors:
+        status = "success"
+    elif inserted or updated:
+        status = "partial"
+    else:
+        status = "error"
+    return jsonify({
+        "status": status,
+        "inserted": inserted,
+        "updated": updated,
+        "errors": errors[:1000],
+        "error_count": len(errors)
+    }), 400 if status == "error" else 200
+
+startup_report['import_seconds'] = round(time.perf_counter() - STARTED, 3)
+
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
     os.makedirs("static/generated", exist_ok=True)
     os.makedirs("static/temp", exist_ok=True)
+    # The debug server re-hashes edited files instead of trusting the manifest
+    static_assets.watch = True
+    static_assets.build(write_manifest=False)
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,356 @@
+"""End-to-end benchmark for the main Primal Fit routes.
+
+Runs the app in-process against a scratch SQLite database, the local LLM stub
+(llm_stub.py) and the offline image provider, so no external API is called
+and runs are repeatable. Results are written to benchmarks/ and compared with
+the previous run.
+
+    python bench.py --users 8 --iterations 50
+    python bench.py --users 16 --duration 30 --fail-on-regression
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Route name -> relative weight in the virtual user's mix
+SCENARIO = {
+    'GET /': 20,
+    'POST /login': 5,
+    'GET /progress': 15,
+    'POST /api/chat': 15,
+    'GET /api/get-image': 20,
+    'POST /api/generate-workout-plan': 10,
+    'POST /api/submit-progress': 15,
+}
+
+IMAGE_QUERIES = ['fitness motivation', 'gym equipment', 'squats exercise', 'healthy nutrition',
+                 'workout music', 'deadlifts exercise', 'fitness podcast', 'burpees exercise']
+CHAT_MESSAGES = ['How do I build muscle?', 'Suggest a quick workout', 'What should I eat after training?',
+                 'How much sleep do I need?']
+WORKOUT_LEVELS = ['beginner', 'intermediate', 'advanced']
+WORKOUT_TYPES = ['strength', 'cardio', 'hypertrophy', 'endurance']
+PASSWORD = 'bench-password'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_stub(port, latency, token_delay, seed):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'llm_stub.py'), '--port', str(port),
+         '--latency', str(latency), '--token-delay', str(token_delay), '--jitter', '0'],
+        env=dict(os.environ, STUB_SEED=str(seed)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/v1/models', timeout=1)
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("LLM stub did not start")
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.4999)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class QueryCounter:
+    # Counts SQL statements issued by the current thread
+    def __init__(self):
+        self.local = threading.local()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.local.count = getattr(self.local, 'count', 0) + 1
+
+    def reset(self):
+        self.local.count = 0
+
+    def read(self):
+        return getattr(self.local, 'count', 0)
+
+
+class VirtualUser:
+    def __init__(self, index, app, counter, seed):
+        self.index = index
+        self.app = app
+        self.counter = counter
+        self.rng = random.Random(seed * 1000 + index)
+        self.email = f'bench{index}@example.com'
+        self.client = None
+        self.samples = []  # (route, seconds, status, queries)
+
+    def request(self, route, method, url, record=True, **kwargs):
+        self.counter.reset()
+        start = time.perf_counter()
+        response = self.client.open(url, method=method, **kwargs)
+        response.get_data()  # drain streamed bodies inside the timing
+        elapsed = time.perf_counter() - start
+        if record:
+            self.samples.append((route, elapsed, response.status_code, self.counter.read()))
+        return response
+
+    def login(self, record=True):
+        # A fresh client, so every login goes through the full password check
+        self.client = self.app.test_client()
+        self.request('POST /login', 'POST', '/login', record=record,
+                     data={'email': self.email, 'password': PASSWORD})
+
+    def step(self, route):
+        rng = self.rng
+        if route == 'POST /login':
+            self.login()
+        elif route == 'POST /api/chat':
+            self.request(route, 'POST', '/api/chat', json={'message': rng.choice(CHAT_MESSAGES)})
+        elif route == 'GET /api/get-image':
+            self.request(route, 'GET', '/api/get-image', query_string={'query': rng.choice(IMAGE_QUERIES)})
+        elif route == 'POST /api/generate-workout-plan':
+            self.request(route, 'POST', '/api/generate-workout-plan', json={
+                'fitness_level': rng.choice(WORKOUT_LEVELS),
+                'workout_type': rng.choice(WORKOUT_TYPES),
+                'available_equipment': rng.choice(['none', 'dumbbells', 'full gym']),
+                'weekly_sessions': str(rng.randint(2, 5))
+            })
+        elif route == 'POST /api/submit-progress':
+            self.request(route, 'POST', '/api/submit-progress', json={
+                'weight': round(rng.uniform(60, 90), 1),
+                'body_fat': round(rng.uniform(10, 30), 1),
+                'calories_consumed': rng.randint(1800, 3000),
+                'calories_burned': rng.randint(200, 900),
+                'workout_duration': rng.randint(20, 90),
+                'sleep_hours': round(rng.uniform(5, 9), 1),
+                'sleep_quality': rng.randint(1, 10)
+            })
+        else:
+            method, url = route.split(' ', 1)
+            self.request(route, method, url)
+
+    def run(self, iterations, warmup, stop_at):
+        self.login(record=False)
+        routes, weights = zip(*SCENARIO.items())
+        count = 0
+        while True:
+            if stop_at is not None and time.perf_counter() >= stop_at:
+                break
+            if stop_at is None and count >= warmup + iterations:
+                break
+            if count == warmup:
+                self.samples.clear()
+            self.step(self.rng.choices(routes, weights)[0])
+            count += 1
+
+
+def summarize(samples, wall):
+    by_route = {}
+    for route, elapsed, status, queries in samples:
+        by_route.setdefault(route, []).append((elapsed, status, queries))
+    routes = {}
+    for route in SCENARIO:
+        rows = by_route.get(route, [])
+        latencies = sorted(r[0] * 1000 for r in rows)
+        routes[route] = {
+            'requests': len(rows),
+            'errors': sum(1 for r in rows if r[1] >= 500),
+            'p50_ms': _round(percentile(latencies, 50)),
+            'p95_ms': _round(percentile(latencies, 95)),
+            'p99_ms': _round(percentile(latencies, 99)),
+            'mean_ms': _round(sum(latencies) / len(latencies)) if latencies else None,
+            'max_ms': _round(latencies[-1]) if latencies else None,
+            'throughput_rps': round(len(rows) / wall, 2) if wall else None,
+            'queries_per_request': round(sum(r[2] for r in rows) / len(rows), 2) if rows else None,
+        }
+    return routes
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def previous_result(directory, baseline):
+    if baseline:
+        path = baseline
+    else:
+        runs = sorted(glob.glob(os.path.join(directory, '*.json')))
+        if not runs:
+            return None, None
+        path = runs[-1]
+    with open(path, 'r', encoding='utf-8') as f:
+        return path, json.load(f)
+
+
+def compare(current, previous, threshold):
+    # Routes whose p95 grew or throughput fell by more than `threshold`
+    regressions = []
+    for route, now in current['routes'].items():
+        before = previous.get('routes', {}).get(route)
+        if not before or not before.get('p95_ms') or not now.get('p95_ms'):
+            continue
+        p95_change = now['p95_ms'] / before['p95_ms'] - 1
+        rps_change = now['throughput_rps'] / before['throughput_rps'] - 1 if before.get('throughput_rps') else 0
+        line = f"{route:34} p95 {before['p95_ms']:>8} -> {now['p95_ms']:>8} ms ({p95_change:+.0%})  " \
+               f"rps {before['throughput_rps']} -> {now['throughput_rps']} ({rps_change:+.0%})"
+        if p95_change > threshold or rps_change < -threshold:
+            regressions.append(route)
+            line += '  REGRESSION'
+        print(line)
+    return regressions
+
+
+def print_table(result):
+    print(f"\n{'route':34} {'reqs':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>8} {'queries':>8}")
+    for route, row in result['routes'].items():
+        print(f"{route:34} {row['requests']:>6} {row['errors']:>4} {str(row['p50_ms']):>8} {str(row['p95_ms']):>8} "
+              f"{str(row['p99_ms']):>8} {str(row['throughput_rps']):>8} {str(row['queries_per_request']):>8}")
+    total = result['total']
+    print(f"\n{total['requests']} requests in {total['wall_seconds']}s: {total['throughput_rps']} req/s, "
+          f"{total['errors']} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--iterations', type=int, default=50, help='requests per user (ignored with --duration)')
+    parser.add_argument('--duration', type=float, help='run for this many seconds instead of a fixed count')
+    parser.add_argument('--warmup', type=int, default=5, help='unrecorded requests per user')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='stub time to first token (s)')
+    parser.add_argument('--llm-token-delay', type=float, default=0.002, help='stub delay per token (s)')
+    parser.add_argument('--history', type=int, default=60, help='progress entries seeded per user')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks'))
+    parser.add_argument('--baseline', help='result file to compare with (default: latest in --output)')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative change flagged as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='primalfit-bench-')
+    port = free_port()
+    stub = start_stub(port, args.llm_latency, args.llm_token_delay, args.seed)
+
+    # Must be set before the app is imported
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'SECRET_KEY': 'bench',
+        'LLM_BACKEND': 'local',
+        'LLM_BASE_URL': f'http://127.0.0.1:{port}/v1',
+        'IMAGE_PROVIDER_MODE': 'offline',
+        'IMAGE_PREWARM': '0',  # prewarmed explicitly below so it can be timed
+        # Virtual users fire far faster than people do; measure the app, not the limiter
+        'RATE_LIMITS': os.getenv('RATE_LIMITS', ''),
+        'DB_AUTO_CREATE': '1',
+    })
+    os.chdir(ROOT)
+    try:
+        import app as primalfit
+        from sqlalchemy import event
+        from werkzeug.security import generate_password_hash
+
+        counter = QueryCounter()
+        rng = random.Random(args.seed)
+        with primalfit.app.app_context():
+            event.listen(primalfit.db.engine, 'before_cursor_execute', counter)
+            password = generate_password_hash(PASSWORD)
+            for index in range(args.users):
+                user = primalfit.User(name=f'Bench {index}', age=30, email=f'bench{index}@example.com',
+                                      password=password)
+                primalfit.db.session.add(user)
+                primalfit.db.session.flush()
+                for day in range(args.history):
+                    entry = primalfit.Progress(
+                        user_id=user.id,
+                        date=date(2025, 1, 1) + timedelta(days=day),
+                        weight=round(rng.uniform(60, 90), 1), body_fat=round(rng.uniform(10, 30), 1),
+                        calories_consumed=rng.randint(1800, 3000), calories_burned=rng.randint(200, 900),
+                        workout_duration=rng.randint(20, 90)
+                    )
+                    primalfit.db.session.add(entry)
+                    primalfit.update_rollups(entry)
+            primalfit.db.session.commit()
+
+        # Cold start as a server sees it: module import, then the page image prewarm
+        startup = {'import_seconds': primalfit.startup_report['import_seconds'],
+                   'prewarm': primalfit.prewarm_images()}
+
+        users = [VirtualUser(i, primalfit.app, counter, args.seed) for i in range(args.users)]
+        stop_at = time.perf_counter() + args.duration if args.duration else None
+        threads = [threading.Thread(target=u.run, args=(args.iterations, args.warmup, stop_at)) for u in users]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    samples = [s for u in users for s in u.samples]
+    result = {
+        'revision': git_revision(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'python': platform.python_version(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'no_save')},
+        'total': {
+            'requests': len(samples),
+            'errors': sum(1 for s in samples if s[2] >= 500),
+            'wall_seconds': round(wall, 2),
+            'throughput_rps': round(len(samples) / wall, 2) if wall else None,
+        },
+        'routes': summarize(samples, wall),
+        'startup': startup,
+    }
+    print_table(result)
+    print(f"Cold start: import {startup['import_seconds']}s, "
+          f"prewarm of {startup['prewarm']['queries']} page images {startup['prewarm']['seconds']}s")
+
+    regressions = []
+    previous_path, previous = previous_result(args.output, args.baseline)
+    if previous:
+        print(f"\nCompared with {os.path.basename(previous_path)} ({previous.get('revision')}):")
+        if previous.get('config') != result['config']:
+            print("  note: the runs used different settings")
+        regressions = compare(result, previous, args.threshold)
+
+    if not args.no_save:
+        os.makedirs(args.output, exist_ok=True)
+        name = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{result['revision']}.json"
+        with open(os.path.join(args.output, name), 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved {os.path.join(args.output, name)}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
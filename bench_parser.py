@@ -0,0 +1,79 @@
+"""Micro-benchmark for plan_parser over a corpus of LLM plan replies.
+
+Compares the structured single-pass parser with the regex extraction it
+replaced, both on complete text and fed in small streamed chunks.
+
+    python bench_parser.py
+    python bench_parser.py --corpus benchmarks/corpus/plans.json --rounds 2000 --chunk 12
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+import plan_parser
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def legacy_exercise_names(plan):
+    # The extraction exercise_images_for used before plan_parser
+    return list(set(
+        re.findall(r'• (.*?):', plan) +
+        re.findall(r'Day \d+: (.*)', plan)[0].split(', ')
+    ))
+
+
+def timed(function, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def streamed(parser_class, text, chunk):
+    parser = parser_class()
+    for i in range(0, len(text), chunk):
+        parser.feed(text[i:i + chunk])
+    return parser.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=os.path.join(ROOT, 'benchmarks', 'corpus', 'plans.json'))
+    parser.add_argument('--rounds', type=int, default=1000)
+    parser.add_argument('--chunk', type=int, default=16, help='characters per streamed chunk')
+    args = parser.parse_args()
+
+    with open(args.corpus, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+
+    print(f"{'response':42} {'chars':>6} {'parse us':>9} {'stream us':>10} {'legacy us':>10}  found")
+    for item in corpus:
+        text, kind = item['text'], item['kind']
+        parse = plan_parser.parse_workout if kind == 'workout' else plan_parser.parse_nutrition
+        parser_class = plan_parser.WorkoutParser if kind == 'workout' else plan_parser.NutritionParser
+
+        result = parse(text)
+        assert streamed(parser_class, text, args.chunk) == result, f"streamed parse differs for {item['name']}"
+        parse_us = timed(lambda: parse(text), args.rounds)
+        stream_us = timed(lambda: streamed(parser_class, text, args.chunk), args.rounds)
+
+        legacy = '-'
+        if kind == 'workout':
+            found = f"{len(plan_parser.exercise_names(result))} exercises, {len(result['schedule'])} days"
+            try:
+                legacy_exercise_names(text)
+                legacy = f"{timed(lambda: legacy_exercise_names(text), args.rounds):.1f}"
+            except IndexError:
+                legacy = 'IndexError'
+        else:
+            found = f"{len(result['macros'])} macros, {len(result['daily_meals'])} meals, " \
+                    f"{len(result['weekly_plan'])} days, {len(result['grocery'])} grocery"
+        name = f"{kind}/{item['name']}"
+        print(f"{name:42} {len(text):>6} {parse_us:>9.1f} {stream_us:>10.1f} {legacy:>10}  {found}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.exc import IntegrityError
+
+
+def estimate_tokens(text):
+    # Rough 4-characters-per-token estimate plus per-message overhead
+    return len(text) // 4 + 4
+
+
+class Conversation:
+    def __init__(self):
+        self.turns = []
+        self.summary = ''
+        self.touched = time.time()
+
+
+class ConversationStore:
+    # Server-side chat history: a token-budgeted window of recent turns plus a
+    # compact rolling summary of everything that fell out of the window
+    def __init__(self, max_conversations=1000, idle_ttl=24 * 3600, token_budget=1500,
+                 summary_chars=800, turn_summary_chars=160):
+        self.max_conversations = max_conversations
+        self.idle_ttl = idle_ttl
+        self.token_budget = token_budget
+        self.summary_chars = summary_chars
+        self.turn_summary_chars = turn_summary_chars
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, chat_id):
+        now = time.time()
+        conversation = self._conversations.get(chat_id)
+        if conversation is None or now - conversation.touched > self.idle_ttl:
+            conversation = Conversation()
+            self._conversations[chat_id] = conversation
+        conversation.touched = now
+        self._conversations.move_to_end(chat_id)
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
+        return conversation
+
+    def _compact(self, conversation):
+        total = sum(estimate_tokens(turn['content']) for turn in conversation.turns)
+        folded = []
+        # Always keep the latest turn, even if it alone exceeds the budget
+        while len(conversation.turns) > 1 and total > self.token_budget:
+            turn = conversation.turns.pop(0)
+            total -= estimate_tokens(turn['content'])
+            text = ' '.join(turn['content'].split())
+            if len(text) > self.turn_summary_chars:
+                text = text[:self.turn_summary_chars].rsplit(' ', 1)[0] + '...'
+            folded.append(f"{turn['role']}: {text}")
+        if folded:
+            summary = '\n'.join(filter(None, [conversation.summary] + folded))
+            if len(summary) > self.summary_chars:
+                # Keep the most recent part of the summary, starting on a line boundary
+                summary = summary[-self.summary_chars:]
+                summary = summary.split('\n', 1)[-1]
+            conversation.summary = summary
+
+    def append(self, chat_id, role, content):
+        with self._lock:
+            conversation = self._get(chat_id)
+            conversation.turns.append({"role": role, "content": content})
+            self._compact(conversation)
+
+    @staticmethod
+    def _render(conversation, base_prompt):
+        messages = list(base_prompt)
+        if conversation.summary:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{conversation.summary}"
+            })
+        messages.extend(dict(turn) for turn in conversation.turns)
+        return messages
+
+    def messages(self, chat_id, base_prompt):
+        with self._lock:
+            return self._render(self._get(chat_id), base_prompt)
+
+    def clear(self, chat_id):
+        with self._lock:
+            self._conversations.pop(chat_id, None)
+
+    def __len__(self):
+        return len(self._conversations)
+
+
+class SQLConversationStore(ConversationStore):
+    # Same window and summary as ConversationStore, kept in one database row
+    # per chat id so every worker process sees the whole conversation.
+    # `model` needs chat_id (primary key), turns (JSON text), summary and
+    # updated (epoch seconds) columns.
+    def __init__(self, session, model, idle_ttl=24 * 3600, token_budget=1500,
+                 summary_chars=800, turn_summary_chars=160, prune_interval=300):
+        super().__init__(idle_ttl=idle_ttl, token_budget=token_budget,
+                         summary_chars=summary_chars, turn_summary_chars=turn_summary_chars)
+        self.session = session
+        self.model = model
+        self.prune_interval = prune_interval
+        self._pruned = 0.0
+
+    def _load(self, chat_id, lock=False):
+        # (row or None, Conversation); idle conversations start over
+        query = self.session.query(self.model).filter_by(chat_id=chat_id)
+        if lock:
+            query = query.with_for_update()
+        row = query.first()
+        conversation = Conversation()
+        if row is not None and time.time() - row.updated <= self.idle_ttl:
+            conversation.turns = json.loads(row.turns)
+            conversation.summary = row.summary
+        return row, conversation
+
+    def append(self, chat_id, role, content):
+        for attempt in range(2):
+            row, conversation = self._load(chat_id, lock=True)
+            conversation.turns.append({"role": role, "content": content})
+            self._compact(conversation)
+            if row is None:
+                row = self.model(chat_id=chat_id)
+                self.session.add(row)
+            row.turns = json.dumps(conversation.turns)
+            row.summary = conversation.summary
+            row.updated = time.time()
+            try:
+                self.session.commit()
+                break
+            except IntegrityError:
+                # Another worker created the row first; append to theirs
+                self.session.rollback()
+                if attempt:
+                    raise
+        self._prune()
+
+    def _prune(self):
+        now = time.time()
+        if now - self._pruned < self.prune_interval:
+            return
+        self._pruned = now
+        self.session.query(self.model).filter(self.model.updated < now - self.idle_ttl)\
+            .delete(synchronize_session=False)
+        self.session.commit()
+
+    def messages(self, chat_id, base_prompt):
+        return self._render(self._load(chat_id)[1], base_prompt)
+
+    def clear(self, chat_id):
+        self.session.query(self.model).filter_by(chat_id=chat_id).delete(synchronize_session=False)
+        self.session.commit()
+
+    def __len__(self):
+        return self.session.query(self.model).count()
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(value):
+    return " ".join(re.findall(r"[a-z0-9]+", str(value or "").lower()))
+
+
+def normalize_list(value):
+    # "Nuts, dairy" and "dairy,nuts" are the same restriction set
+    items = [normalize_text(item) for item in re.split(r"[,;/]| and ", str(value or ""))]
+    return sorted({item for item in items if item and item != "none"})
+
+
+def bucket(value, size):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return normalize_text(value)
+    if not size:
+        return number
+    return int(round(number / size)) * size
+
+
+def plan_key(kind, params, buckets=None, lists=()):
+    # Numeric fields are rounded to their bucket, list fields are order-free,
+    # everything else is compared case- and punctuation-insensitively
+    buckets = buckets or {}
+    normalized = {}
+    for field in sorted(params):
+        value = params[field]
+        if field in buckets:
+            normalized[field] = bucket(value, buckets[field])
+        elif field in lists:
+            normalized[field] = normalize_list(value)
+        else:
+            normalized[field] = normalize_text(value)
+    raw = json.dumps([kind, normalized], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    def __init__(self, max_entries=500, ttl=24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,98 @@
+import os
+import time
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+
+
+def database_url():
+    url = os.getenv('DATABASE_URL', 'sqlite:///primalfit.db')
+    # Hosted Postgres often hands out the legacy scheme SQLAlchemy no longer accepts
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url):
+    if url.startswith('sqlite'):
+        return {
+            'connect_args': {
+                'timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', 15)),
+                'check_same_thread': False
+            }
+        }
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True
+    }
+
+
+def _tune_sqlite(dbapi_connection, connection_record):
+    # WAL lets readers proceed while a writer commits; busy_timeout makes
+    # concurrent writers wait instead of failing with "database is locked"
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f"PRAGMA busy_timeout={int(float(os.getenv('SQLITE_BUSY_TIMEOUT', 15)) * 1000)}")
+    cursor.execute(f"PRAGMA synchronous={os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')}")
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+
+def configure(app):
+    url = database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+
+
+def init_database(app, db, attempts=3):
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _tune_sqlite)
+
+        if os.getenv('DB_AUTO_CREATE', '1') != '1':
+            return
+        for attempt in range(attempts):
+            try:
+                db.create_all()
+                migrate(engine, db.metadata)
+                return
+            except OperationalError:
+                # Another worker may be creating the same tables right now
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.5 * (attempt + 1))
+
+
+def increment(session, table, keys, deltas):
+    # Adds `deltas` to the row matching `keys`, creating it if needed, in one
+    # statement so concurrent writers can't lose updates or race the insert.
+    # `keys` must be the columns of a unique constraint.
+    dialect = session.get_bind().dialect.name
+    values = dict(keys, **deltas)
+    if dialect == 'mysql':
+        statement = mysql.insert(table).values(**values)
+        statement = statement.on_duplicate_key_update(
+            {column: func.coalesce(table.c[column], 0) + statement.inserted[column] for column in deltas})
+    else:
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert(table).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={column: func.coalesce(table.c[column], 0) + statement.excluded[column] for column in deltas})
+    session.execute(statement)
+
+
+def migrate(engine, metadata):
+    # create_all skips tables that already exist, so indexes added to an
+    # existing model are created here
+    inspector = inspect(engine)
+    for table in metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(engine, checkfirst=True)
@@ -0,0 +1,59 @@
+import hashlib
+import os
+import tempfile
+from collections import namedtuple
+
+IMAGE_TYPES = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/jpg': 'jpg',
+    'image/webp': 'webp',
+    'image/gif': 'gif',
+}
+
+Download = namedtuple('Download', 'path digest ext size')
+
+
+class DownloadError(Exception):
+    pass
+
+
+def stream_to_temp(response, directory, max_bytes, chunk_size=64 * 1024, allowed_types=IMAGE_TYPES):
+    # Streams a `stream=True` response into a temp file, hashing as it goes,
+    # so memory stays flat whatever the image size
+    try:
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in allowed_types:
+            raise DownloadError(f"Unexpected content type: {content_type or 'missing'}")
+        declared = response.headers.get('Content-Length')
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise DownloadError(f"Image too large: {declared} bytes")
+
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, path = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise DownloadError(f"Image exceeds {max_bytes} bytes")
+                    digest.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            discard(path)
+            raise
+        if not size:
+            discard(path)
+            raise DownloadError("Empty image")
+        return Download(path, digest.hexdigest(), allowed_types[content_type], size)
+    finally:
+        response.close()
+
+
+def discard(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
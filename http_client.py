@@ -0,0 +1,168 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+import metrics
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    pass
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive failures and lets a single probe
+    # through once `reset_after` seconds have passed
+    def __init__(self, threshold=5, reset_after=30):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at >= self.reset_after:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_after or self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+def _never_sent(error):
+    # True when the request can't have reached the server, so even a POST is
+    # safe to send again
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.exceptions.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def _retry_after(response):
+    # Seconds from a numeric Retry-After header, None when absent or a date
+    try:
+        return max(0.0, float(response.headers.get('Retry-After', '')))
+    except ValueError:
+        return None
+
+
+class HttpClient:
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    # Statuses that mean a POST was turned away rather than processed
+    POST_RETRY_STATUSES = (429, 503)
+    IDEMPOTENT = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+    def __init__(self, timeout=(3.05, 10), retries=2, backoff=0.5, pool_size=10,
+                 breaker_threshold=5, breaker_reset=30, max_retry_after=5):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after  # longer Retry-After answers are returned, not slept through
+        self.pool_size = pool_size
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self._sessions = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _session(self, url):
+        # One keep-alive pool per scheme+host
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                # Retries happen in request() so the breaker sees every attempt
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session = requests.Session()
+                session.mount(f"{parts.scheme}://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def breaker(self, provider):
+        with self._lock:
+            breaker = self._breakers.get(provider)
+            if breaker is None:
+                breaker = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+                self._breakers[provider] = breaker
+            return breaker
+
+    def request(self, provider, method, url, timeout=None, retries=None, **kwargs):
+        # GETs are retried on any error or retryable status; POSTs only when
+        # the server can't have acted on them: connect failures and 429/503
+        breaker = self.breaker(provider)
+        retries = self.retries if retries is None else retries
+        idempotent = method.upper() in self.IDEMPOTENT
+        statuses = self.RETRY_STATUSES if idempotent else self.POST_RETRY_STATUSES
+        with metrics.span('http', provider) as span:
+            attempt = 0
+            while True:
+                if not breaker.allow():
+                    raise CircuitOpenError(f"{provider} circuit is open")
+                try:
+                    response = self._session(url).request(method, url, timeout=timeout or self.timeout, **kwargs)
+                except requests.exceptions.RequestException as e:
+                    breaker.record_failure()
+                    if attempt >= retries or not (idempotent or _never_sent(e)):
+                        raise
+                    delay = self.backoff * 2 ** attempt
+                else:
+                    if response.status_code not in self.RETRY_STATUSES:
+                        breaker.record_success()
+                        break
+                    breaker.record_failure()
+                    if attempt >= retries or response.status_code not in statuses:
+                        break
+                    delay = _retry_after(response)
+                    if delay is None:
+                        delay = self.backoff * 2 ** attempt
+                    elif delay > self.max_retry_after:
+                        break
+                    response.close()
+                attempt += 1
+                time.sleep(delay)
+            if response.status_code >= 400:
+                span.fail()
+            return response
+
+    def get(self, provider, url, **kwargs):
+        return self.request(provider, 'GET', url, **kwargs)
+
+    def post(self, provider, url, **kwargs):
+        return self.request(provider, 'POST', url, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+            hosts = sorted(self._sessions)
+        return {
+            'hosts': hosts,
+            'breakers': {name: {'state': b.state, 'failures': b.failures} for name, b in breakers.items()}
+        }
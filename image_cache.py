@@ -0,0 +1,381 @@
+import errno
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, run a single worker
+    fcntl = None
+
+
+def normalize_query(query):
+    # "Fitness  Motivation!" and "fitness motivation" share one cache slot
+    return " ".join(re.findall(r"[a-z0-9]+", (query or "").lower()))
+
+
+def try_lock(path):
+    # Non-blocking exclusive flock held until the returned file is closed, or
+    # None while another process holds it
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    handle = open(path, "a")
+    if fcntl is None:
+        return handle
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def cache_key(query):
+    return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()[:24]
+
+
+class ImageCache:
+    INDEX_NAME = "index.json"
+
+    def __init__(self, directory, max_entries=200, max_bytes=64 * 1024 * 1024, ttl=7 * 24 * 3600,
+                 on_remove=None, index_path=None, flush_interval=60, incoming=None):
+        self.directory = directory
+        self.on_remove = on_remove  # called with each filename deleted from disk
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # Keep the index out of `directory` when that is publicly served
+        self.index_path = index_path or os.path.join(directory, self.INDEX_NAME)
+        self.flush_interval = flush_interval  # max seconds access times stay unsaved
+        # Partial downloads; keep them out of `directory` when that is publicly served
+        self.incoming = incoming or os.path.join(directory, ".incoming")
+        self.lock_path = f"{self.index_path}.lock"
+        self._lock = threading.Lock()
+        self._lock_file = None  # (pid, open file); flock needs one per process
+        self._entries = {}
+        self._touched = {}  # key -> access time not yet written to the index
+        self._stamp = None  # identity of the index file last read
+        self._saved = time.time()
+        with self._locked():
+            self._load()
+
+    # Index persistence. Every worker process sharing the directory reads and
+    # writes the same index file under an flock, so each change starts from
+    # what is on disk and no process drops another's entries or deletes a
+    # file another process's entry still points at.
+    @contextmanager
+    def _locked(self, exclusive=True):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            if self._lock_file is None or self._lock_file[0] != os.getpid():
+                # A forked worker must not share its parent's lock
+                os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+                self._lock_file = (os.getpid(), open(self.lock_path, "a"))
+            handle = self._lock_file[1]
+            fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _index_stamp(self):
+        try:
+            stat = os.stat(self.index_path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f).get("entries", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self):
+        legacy_path = os.path.join(self.directory, self.INDEX_NAME)
+        if not os.path.exists(self.index_path) and os.path.exists(legacy_path):
+            # Written by a version that kept the index next to the images
+            entries = self._read(legacy_path)
+            self._entries = {
+                key: entry for key, entry in entries.items()
+                if os.path.exists(os.path.join(self.directory, entry["file"]))
+            }
+            self._save()
+            os.remove(legacy_path)
+        else:
+            self._reload()
+
+    def _reload(self):
+        # Picks up entries other processes wrote since this one last looked
+        stamp = self._index_stamp()
+        if stamp == self._stamp:
+            return
+        before = self._referenced()
+        self._entries = self._read(self.index_path)
+        self._stamp = stamp
+        for key, when in self._touched.items():
+            entry = self._entries.get(key)
+            if entry:
+                entry["last_access"] = max(entry["last_access"], when)
+        if self.on_remove:
+            # Files another process evicted
+            for name in before - self._referenced():
+                if not os.path.exists(os.path.join(self.directory, name)):
+                    self.on_remove(name)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": self._entries}, f)
+        os.replace(tmp_path, self.index_path)
+        self._stamp = self._index_stamp()
+        self._touched.clear()
+        self._saved = time.time()
+
+    def flush(self):
+        with self._locked():
+            self._reload()
+            if self._touched:
+                self._save()
+
+    # Lookup / insert
+    def get(self, query):
+        key = cache_key(query)
+        now = time.time()
+        with self._locked(exclusive=False):
+            self._reload()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expired = self.ttl and now - entry["created"] > self.ttl
+            if not expired:
+                # Access time only lives in memory until the next write or flush
+                entry["last_access"] = now
+                self._touched[key] = now
+                filename = entry["file"]
+        if expired:
+            self._expire(key)
+            return None
+        if now - self._saved > self.flush_interval:
+            self.flush()
+        return filename
+
+    def _expire(self, key):
+        with self._locked():
+            self._reload()
+            entry = self._entries.get(key)
+            if entry and time.time() - entry["created"] > self.ttl:
+                self._remove(key)
+                self._save()
+
+    def get_entry(self, query):
+        filename = self.get(query)
+        if filename is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(cache_key(query))
+            return dict(entry) if entry else None
+
+    def _write(self, filename, data):
+        full_path = os.path.join(self.directory, filename)
+        if os.path.exists(full_path):
+            return
+        tmp_path = f"{full_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, full_path)
+
+    def put(self, query, data, ext="png", variants=(), width=None):
+        # Files are content-addressed; `variants` are resized/re-encoded copies
+        # (dicts with width, ext, data) stored and evicted with the main file
+        digest = hashlib.sha256(data).hexdigest()[:24]
+        filename = f"{digest}.{ext}"
+        with self._locked():
+            self._reload()
+            os.makedirs(self.directory, exist_ok=True)
+            self._write(filename, data)
+            stored = self._write_variants(digest, variants)
+            size = len(data) + sum(len(v["data"]) for v in variants)
+            self._commit(query, filename, size, stored, width, ext)
+        return filename
+
+    def put_file(self, query, download):
+        # Moves a finished stream_to_temp() download into its content address
+        filename = f"{download.digest[:24]}.{download.ext}"
+        with self._locked():
+            self._reload()
+            os.makedirs(self.directory, exist_ok=True)
+            full_path = os.path.join(self.directory, filename)
+            if os.path.exists(full_path):
+                os.remove(download.path)
+            else:
+                self._adopt(download.path, full_path)
+            self._commit(query, filename, download.size, [], None, download.ext)
+        return filename
+
+    @staticmethod
+    def _adopt(source, target):
+        # A rename when `incoming` shares the filesystem; otherwise copy next
+        # to the target first so the final rename is still atomic
+        try:
+            os.replace(source, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            tmp_path = f"{target}.{threading.get_ident()}.tmp"
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, target)
+            os.remove(source)
+
+    def _write_variants(self, digest, variants):
+        stored = []
+        for variant in variants:
+            name = f"{digest}-{variant['width']}.{variant['ext']}"
+            self._write(name, variant["data"])
+            stored.append({"file": name, "width": variant["width"], "format": variant["ext"]})
+        return stored
+
+    def _commit(self, query, filename, size, stored, width, ext):
+        key = cache_key(query)
+        now = time.time()
+        if width:
+            stored.insert(0, {"file": filename, "width": width, "format": ext})
+        old = self._entries.pop(key, None)
+        self._entries[key] = {
+            "query": normalize_query(query),
+            "file": filename,
+            "variants": stored,
+            "size": size,
+            "created": now,
+            "last_access": now,
+        }
+        self._touched.pop(key, None)
+        if old:
+            self._release(old)
+        self._evict()
+        self._save()
+
+    def files(self):
+        # (filename, normalized query) for every cached image
+        with self._locked(exclusive=False):
+            self._reload()
+            return [(e["file"], e["query"]) for e in self._entries.values()]
+
+    def invalidate(self, query):
+        with self._locked():
+            self._reload()
+            if self._remove(cache_key(query)):
+                self._save()
+
+    # Eviction
+    @staticmethod
+    def _files(entry):
+        return {entry["file"]} | {v["file"] for v in entry.get("variants", ())}
+
+    def _referenced(self):
+        names = set()
+        for entry in self._entries.values():
+            names |= self._files(entry)
+        return names
+
+    def _release(self, entry):
+        # Identical images from different queries share files, so only delete
+        # the ones no remaining entry still points at. Callers hold the
+        # exclusive lock and have just reloaded, so that covers every process.
+        for name in self._files(entry) - self._referenced():
+            self._unlink(name)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._release(entry)
+        return entry is not None
+
+    def _unlink(self, filename):
+        try:
+            os.remove(os.path.join(self.directory, filename))
+        except OSError:
+            return
+        if self.on_remove:
+            self.on_remove(filename)
+
+    def _evict(self):
+        now = time.time()
+        if self.ttl:
+            for key in [k for k, e in self._entries.items() if now - e["created"] > self.ttl]:
+                self._remove(key)
+
+        total = sum(e["size"] for e in self._entries.values())
+        lru = sorted(self._entries, key=lambda k: self._entries[k]["last_access"])
+        while lru and (len(self._entries) > self.max_entries or total > self.max_bytes):
+            key = lru.pop(0)
+            total -= self._entries[key]["size"]
+            self._remove(key)
+
+    def remove_orphans(self, grace=3600):
+        # Drop files (e.g. old timestamped PNGs) that the index doesn't know
+        # about. Files younger than `grace` seconds are kept: another process
+        # may be about to index them or still be downloading them.
+        cutoff = time.time() - grace
+
+        def stale(path):
+            try:
+                return os.path.isfile(path) and os.path.getmtime(path) < cutoff
+            except OSError:
+                return False
+
+        with self._locked():
+            self._reload()
+            known = self._referenced()
+            known.add(os.path.relpath(self.index_path, self.directory))
+            known.add(os.path.relpath(self.lock_path, self.directory))
+            removed = 0
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return 0
+            for name in names:
+                if name not in known and stale(os.path.join(self.directory, name)):
+                    self._unlink(name)
+                    removed += 1
+            # Partial downloads left behind by a crash or restart, including
+            # the public folder older versions kept them in
+            for folder in {self.incoming, os.path.join(self.directory, ".incoming")}:
+                try:
+                    partials = os.listdir(folder)
+                except OSError:
+                    continue
+                for name in partials:
+                    path = os.path.join(folder, name)
+                    if stale(path):
+                        try:
+                            os.remove(path)
+                            removed += 1
+                        except OSError:
+                            pass
+            if self.incoming != os.path.join(self.directory, ".incoming"):
+                try:
+                    os.rmdir(os.path.join(self.directory, ".incoming"))
+                except OSError:
+                    pass  # missing, or still holds a recent partial
+            return removed
+
+    def stats(self):
+        with self._locked(exclusive=False):
+            self._reload()
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(e["size"] for e in self._entries.values()),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
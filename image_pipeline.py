@@ -0,0 +1,71 @@
+import io
+import os
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow is optional; without it originals are served as-is
+    Image = None
+    features = None
+
+WIDTHS = tuple(int(w) for w in os.getenv('IMAGE_VARIANT_WIDTHS', '480,960,1600').split(','))
+QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', 78))
+
+# Pillow format name, file extension, MIME type
+FORMATS = [('WEBP', 'webp', 'image/webp'), ('JPEG', 'jpg', 'image/jpeg')]
+# Extension -> MIME type, most preferred first
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpg': 'image/jpeg'}
+
+
+def available():
+    return Image is not None
+
+
+def _formats():
+    formats = list(FORMATS)
+    if features is not None and os.getenv('IMAGE_VARIANT_AVIF', '0') == '1':
+        try:
+            if features.check('avif'):
+                formats.insert(0, ('AVIF', 'avif', 'image/avif'))
+        except ValueError:
+            pass
+    return formats
+
+
+def process(source):
+    # `source` is a file path or bytes.
+    # Returns (primary, others) or None when the image can't be processed.
+    # Each variant is a dict with width, ext, mime and data; re-encoding
+    # without passing exif/icc info strips the metadata.
+    if Image is None:
+        return None
+    try:
+        with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as original:
+            original.load()
+            image = original.convert('RGB')
+    except Exception:
+        return None
+
+    widths = sorted({min(w, image.width) for w in WIDTHS})
+    variants = []
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt, ext, mime in _formats():
+            buffer = io.BytesIO()
+            options = {'quality': QUALITY}
+            if fmt == 'JPEG':
+                options.update(optimize=True, progressive=True)
+            elif fmt == 'WEBP':
+                options.update(method=4)
+            try:
+                resized.save(buffer, fmt, **options)
+            except (OSError, ValueError, KeyError):
+                continue
+            variants.append({'width': width, 'ext': ext, 'mime': mime, 'data': buffer.getvalue()})
+
+    # The largest JPEG doubles as the plain URL for CSS backgrounds and old browsers
+    jpegs = [v for v in variants if v['ext'] == 'jpg']
+    if not jpegs:
+        return None
+    primary = jpegs[-1]
+    return primary, [v for v in variants if v is not primary]
@@ -0,0 +1,103 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobRejected(Exception):
+    def __init__(self, message, status_code, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, user_id, kind):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.kind = kind
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class JobQueue:
+    # Bounded in-process job runner: a fixed worker pool, a cap on how many
+    # jobs each user may have in flight and a cap on the total backlog
+    def __init__(self, workers=4, per_user=2, backlog=50, retention=600, format_error=str):
+        self.per_user = per_user
+        self.backlog = backlog
+        self.retention = retention
+        self.format_error = format_error
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._changed = threading.Condition()
+
+    def submit(self, user_id, kind, fn, *args, **kwargs):
+        with self._changed:
+            self._purge()
+            active = [job for job in self._jobs.values() if job.active]
+            if len(active) >= self.backlog:
+                raise JobRejected('Job backlog is full, try again shortly', 503, 10)
+            if sum(1 for job in active if job.user_id == user_id) >= self.per_user:
+                raise JobRejected('Too many jobs in progress for this user', 429, 5)
+            job = Job(user_id, kind)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        self._update(job, status='running', started=time.time())
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._update(job, status='error', error=self.format_error(e), finished=time.time())
+        else:
+            self._update(job, status='done', result=result, finished=time.time())
+
+    def _update(self, job, **fields):
+        with self._changed:
+            for name, value in fields.items():
+                setattr(job, name, value)
+            self._changed.notify_all()
+
+    def _purge(self):
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._changed:
+            return self._jobs.get(job_id)
+
+    def wait(self, job, timeout, seen_status=None):
+        # Block until the job leaves `seen_status` or the timeout passes
+        with self._changed:
+            self._changed.wait_for(lambda: job.status != seen_status, timeout=timeout)
+            return job.to_dict()
+
+    def stats(self):
+        with self._changed:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {'jobs': counts, 'per_user': self.per_user, 'backlog': self.backlog}
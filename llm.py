@@ -0,0 +1,98 @@
+import json
+import os
+from contextlib import nullcontext
+
+import metrics
+
+# Every backend speaks the OpenAI chat completions API; they differ only in
+# where it lives, which key it takes and the default model
+BACKENDS = {
+    'groq': ('https://api.groq.com/openai/v1', 'GROQ_API_KEY', 'llama-3.3-70b-versatile'),
+    'openai': ('https://api.openai.com/v1', 'OPENAI_API_KEY', 'gpt-4o-mini'),
+    'local': ('http://127.0.0.1:8001/v1', None, 'stub'),  # see llm_stub.py
+}
+
+
+class LLMClient:
+    def __init__(self, http, backend='groq', base_url=None, api_key=None, model=None,
+                 temperature=0.7, timeout=(3.05, 60), gate=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown LLM backend: {backend}")
+        default_url, key_env, default_model = BACKENDS[backend]
+        self.http = http
+        self.backend = backend
+        self.url = (base_url or default_url).rstrip('/') + '/chat/completions'
+        self.api_key = api_key or (os.getenv(key_env) if key_env else None)
+        self.model = model or default_model
+        self.temperature = temperature
+        self.timeout = timeout
+        self.gate = gate  # admission.ConcurrencyGate shared with other AI calls
+
+    @classmethod
+    def from_env(cls, http, gate=None):
+        return cls(
+            http,
+            backend=os.getenv('LLM_BACKEND', 'groq'),
+            base_url=os.getenv('LLM_BASE_URL'),
+            api_key=os.getenv('LLM_API_KEY'),
+            model=os.getenv('LLM_MODEL'),
+            temperature=float(os.getenv('LLM_TEMPERATURE', 0.7)),
+            timeout=(float(os.getenv('LLM_CONNECT_TIMEOUT', 3.05)), float(os.getenv('LLM_TIMEOUT', 60))),
+            gate=gate
+        )
+
+    def _slot(self):
+        return self.gate.slot() if self.gate is not None else nullcontext()
+
+    def reserve(self):
+        # Takes the concurrency slot for a stream() call up front, so a
+        # streaming view can answer 429 before its response starts
+        return self._slot()
+
+    def _post(self, messages, max_tokens, stream, timeout=None, retries=None):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        response = self.http.post(
+            self.backend,
+            self.url,
+            headers=headers,
+            json={
+                "model": self.model,
+                "messages": messages,
+                "temperature": self.temperature,
+                "max_tokens": max_tokens,
+                "stream": stream
+            },
+            stream=stream,
+            timeout=timeout or self.timeout,
+            retries=retries
+        )
+        response.raise_for_status()
+        return response
+
+    def complete(self, messages, max_tokens=500, timeout=None, retries=None):
+        # `timeout` and `retries` override the client defaults for one call
+        with self._slot(), metrics.span('llm', self.backend):
+            response = self._post(messages, max_tokens, False, timeout, retries)
+            return response.json()['choices'][0]['message']['content']
+
+    def stream(self, messages, max_tokens=500, timeout=None, retries=None, slot=None):
+        # Yields raw completion tokens as the backend produces them; the span
+        # covers the whole generation, not just the first byte, and so does
+        # the concurrency slot (`slot` from reserve(), else taken on first read)
+        with slot if slot is not None else self._slot(), metrics.span('llm', self.backend):
+            response = self._post(messages, max_tokens, True, timeout, retries)
+            with response:
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith('data: '):
+                        continue
+                    payload = line[len('data: '):]
+                    if payload == '[DONE]':
+                        break
+                    token = json.loads(payload)['choices'][0]['delta'].get('content')
+                    if token:
+                        yield token
+
+    def describe(self):
+        return {'backend': self.backend, 'url': self.url, 'model': self.model}
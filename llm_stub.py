@@ -0,0 +1,165 @@
+"""OpenAI-compatible chat completions stub for load testing.
+
+    python llm_stub.py --port 8001 --latency 0.4 --token-delay 0.02
+    LLM_BACKEND=local python app.py
+"""
+import argparse
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+WORKOUT_PLAN = """[Workout Schedule]
+Day 1: Push-ups, Squats, Plank
+Day 2: Lunges, Dumbbell Rows, Glute Bridges
+Day 3: Burpees, Mountain Climbers, Deadlifts
+
+[Exercise Details]
+• Push-ups: Chest - 3x12 - Keep the body in a straight line and lower until the chest nearly touches the floor.
+• Squats: Legs - 4x10 - Sit back through the hips and keep the knees tracking over the toes.
+• Plank: Core - 3x45s - Brace the abs and hold a straight line from head to heels.
+• Lunges: Legs - 3x10 - Step forward and lower the back knee toward the floor.
+• Dumbbell Rows: Back - 3x12 - Pull the weight to the hip while keeping the back flat.
+• Glute Bridges: Glutes - 3x15 - Drive through the heels and squeeze at the top.
+• Burpees: Full Body - 3x10 - Squat, kick back, push up and jump.
+• Mountain Climbers: Core - 3x30s - Drive the knees toward the chest at a steady pace.
+• Deadlifts: Posterior Chain - 4x8 - Hinge at the hips with a neutral spine.
+
+[Progression Plan]
+- Week 1: Learn the movements with moderate effort.
+- Week 2: Add one set to each exercise.
+- Week 3: Increase load or reps by 10 percent.
+- Week 4: Deload with two sets per exercise."""
+
+NUTRITION_PLAN = """[BMI Analysis]
+BMI 23.1 - Normal weight. You are in a great place to build strength and energy.
+
+[Macronutrients]
+- Protein: 30%
+- Carbs: 45%
+- Fats: 25%
+
+[Daily Meal Plan]
+- Breakfast: Oatmeal with berries and Greek yogurt
+- Lunch: Grilled chicken, quinoa and roasted vegetables
+- Dinner: Baked salmon, sweet potato and green beans
+- Snacks: Apple with peanut butter, mixed nuts
+
+[Weekly Diet Plan]
+- Monday: Chicken and rice bowl
+- Tuesday: Lentil curry with brown rice
+- Wednesday: Turkey wraps and salad
+- Thursday: Salmon with quinoa
+- Friday: Tofu stir fry
+- Saturday: Lean beef chili
+- Sunday: Egg omelette and whole grain toast
+
+[Grocery List]
+- Oats, berries, Greek yogurt
+- Chicken breast, salmon, lean beef, tofu
+- Quinoa, brown rice, sweet potatoes
+- Mixed vegetables, leafy greens
+- Nuts, peanut butter, olive oil
+
+[Prep Tips]
+1. Batch cook grains and proteins twice a week.
+2. Drink at least 2.5 litres of water a day.
+3. Keep cut vegetables ready for quick snacks.
+4. Pair the plan with three workouts a week."""
+
+TIPS_REPLY = """Prep breakfasts the night before so busy mornings stay on plan.
+Spread protein evenly across meals rather than loading it at dinner.
+Keep a refillable water bottle in sight to hit your daily water target."""
+
+CHAT_REPLY = """Great question!
+- Warm up for 5 to 10 minutes before training.
+- Focus on compound movements like squats, push-ups and rows.
+- Aim for 7 to 9 hours of sleep to recover.
+- Stay hydrated and keep protein high at each meal.
+What equipment do you have available so I can tailor a plan for you?"""
+
+app = Flask(__name__)
+settings = {'latency': 0.3, 'token_delay': 0.01, 'jitter': 0.2, 'error_rate': 0.0}
+rng = random.Random(os.getenv('STUB_SEED'))
+
+
+def _reply(messages):
+    prompt = ' '.join(str(m.get('content', '')) for m in messages if m.get('role') == 'user').lower()
+    if 'workout plan' in prompt:
+        return WORKOUT_PLAN
+    if 'nutrition plan' in prompt:
+        return NUTRITION_PLAN
+    if 'practical tips' in prompt:
+        return TIPS_REPLY
+    return CHAT_REPLY
+
+
+def _tokens(text, max_tokens):
+    # Word-sized tokens that keep their whitespace, so joining them restores the text
+    return re.findall(r'\S+\s*|\s+', text)[:max_tokens]
+
+
+def _delay(seconds):
+    if seconds > 0:
+        time.sleep(seconds * (1 + rng.uniform(-settings['jitter'], settings['jitter'])))
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    body = request.get_json(force=True)
+    if rng.random() < settings['error_rate']:
+        return jsonify({'error': {'message': 'Simulated upstream failure'}}), 503
+
+    model = body.get('model', 'stub')
+    tokens = _tokens(_reply(body.get('messages', [])), int(body.get('max_tokens') or 500))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    _delay(settings['latency'])
+
+    if not body.get('stream'):
+        _delay(settings['token_delay'] * len(tokens))
+        return jsonify({
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ''.join(tokens)},
+                         'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': len(tokens), 'total_tokens': len(tokens)}
+        })
+
+    def events():
+        for token in tokens:
+            chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'model': model,
+                     'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            _delay(settings['token_delay'])
+        yield "data: [DONE]\n\n"
+
+    return Response(events(), mimetype='text/event-stream')
+
+
+@app.route('/v1/models')
+def models():
+    return jsonify({'object': 'list', 'data': [{'id': 'stub', 'object': 'model'}]})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=float(os.getenv('STUB_LATENCY', 0.3)),
+                        help='seconds before the first token')
+    parser.add_argument('--token-delay', type=float, default=float(os.getenv('STUB_TOKEN_DELAY', 0.01)),
+                        help='seconds between tokens')
+    parser.add_argument('--jitter', type=float, default=float(os.getenv('STUB_JITTER', 0.2)),
+                        help='random +/- fraction applied to every delay')
+    parser.add_argument('--error-rate', type=float, default=float(os.getenv('STUB_ERROR_RATE', 0)),
+                        help='fraction of requests answered with a 503')
+    args = parser.parse_args()
+    settings.update(latency=args.latency, token_delay=args.token_delay, jitter=args.jitter,
+                    error_rate=args.error_rate)
+    app.run(host=args.host, port=args.port, threaded=True)
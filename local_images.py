@@ -0,0 +1,162 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from image_cache import normalize_query
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.gif', '.avif'}
+TAGS_FILE = 'tags.json'  # optional {"relative/path.jpg": ["tag", ...]} next to the images
+# Words the app's own query templates add ("<name> exercise proper form").
+# They're rare on disk, so IDF would rank them above the words that matter.
+STOPWORDS = {'exercise', 'proper', 'form', 'professional', 'photography'}
+
+_TIMESTAMP = re.compile(r'^\d{14}_')
+_DIGEST = re.compile(r'^[0-9a-f]{24}(-\d+)?$')
+
+
+def tokens(text):
+    # Light stemming so "workouts" finds "workout"
+    return [t[:-1] if len(t) > 3 and t.endswith('s') and not t.endswith('ss') else t
+            for t in normalize_query(text).split()]
+
+
+def filename_text(name):
+    # "20250418154830_fitness analytics.png" -> "fitness analytics"
+    stem = os.path.splitext(name)[0]
+    if _DIGEST.match(stem):
+        return ''  # Content-addressed files are indexed by their cache query instead
+    # "founder1" is also indexed as "founder"
+    return re.sub(r'(?<=[A-Za-z])(?=\d)', ' ', _TIMESTAMP.sub('', stem))
+
+
+class LocalImageIndex:
+    # Keyword index over images already on disk: no network, deterministic picks
+    def __init__(self, static_dir, directories=('images', 'generated'), fallback_dir='images/fallback',
+                 max_memo=4096, stopwords=STOPWORDS):
+        self.static_dir = static_dir
+        self.stopwords = stopwords
+        self.directories = directories
+        self.fallback_dir = fallback_dir
+        self.max_memo = max_memo
+        self._lock = threading.Lock()
+        self._postings = {}  # token -> set of static-relative paths
+        self._paths = {}  # static-relative path -> its tokens
+        self._fallbacks = []
+        self._memo = OrderedDict()
+        self._built = False
+
+    def _tags(self, directory):
+        try:
+            with open(os.path.join(self.static_dir, directory, TAGS_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def build(self, extra=()):
+        # `extra` is (static path, text) pairs, e.g. image cache entries and their queries
+        postings = {}
+        paths = {}
+        fallbacks = []
+
+        def add(path, text):
+            words = set(tokens(text))
+            paths[path] = paths.get(path, set()) | words
+            for token in words:
+                postings.setdefault(token, set()).add(path)
+
+        for directory in self.directories:
+            root = os.path.join(self.static_dir, directory)
+            tags = self._tags(directory)
+            for current, dirs, files in os.walk(root):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                for name in files:
+                    if os.path.splitext(name)[1].lower() not in IMAGE_EXTENSIONS:
+                        continue
+                    relative = os.path.relpath(os.path.join(current, name), root).replace(os.sep, '/')
+                    path = f'{directory}/{relative}'
+                    text = ' '.join([filename_text(name)] + list(tags.get(relative, ())))
+                    if path.startswith(self.fallback_dir + '/'):
+                        fallbacks.append(path)
+                    if text.strip():
+                        add(path, text)
+        for path, text in extra:
+            add(path, text)
+
+        with self._lock:
+            self._postings = postings
+            self._paths = paths
+            self._fallbacks = sorted(fallbacks)
+            self._memo.clear()
+            self._built = True
+        return len(paths)
+
+    def add(self, path, text):
+        words = set(tokens(text))
+        with self._lock:
+            self._paths[path] = self._paths.get(path, set()) | words
+            for token in words:
+                self._postings.setdefault(token, set()).add(path)
+            self._memo.clear()
+
+    def remove(self, path):
+        # Forget an image deleted from disk so it's never served again
+        with self._lock:
+            if path not in self._paths:
+                return
+            for token in self._paths.pop(path):
+                self._postings[token].discard(path)
+                if not self._postings[token]:
+                    del self._postings[token]
+            if path in self._fallbacks:
+                self._fallbacks.remove(path)
+            self._memo.clear()
+
+    def match(self, query):
+        # Best keyword match, else a stable pick from the fallback folder, else None
+        if not self._built:
+            self.build()
+        key = normalize_query(query)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+            result = self._best(key) or self._fallback(key)
+            self._memo[key] = result
+            while len(self._memo) > self.max_memo:
+                self._memo.popitem(last=False)
+            return result
+
+    def _best(self, key):
+        total = len(self._paths) or 1
+        scores = {}
+        words = set(tokens(key))
+        for token in words - self.stopwords or words:
+            matches = self._postings.get(token, ())
+            # Rare words say more about the image than "fitness" does
+            weight = math.log((total + 1) / (len(matches) + 1)) + 1
+            for path in matches:
+                scores[path] = scores.get(path, 0) + weight
+        if not scores:
+            return None
+        # Ties go to the image with the fewest words the query didn't ask for
+        # ("Squats" over "Jump Squats"), then the path so picks are stable
+        return min(scores, key=lambda path: (-scores[path], self._extra(path, words), path))
+
+    def _extra(self, path, words):
+        # Stopwords and legacy names cut mid-word ("... exercise prop") don't count
+        return sum(1 for token in self._paths[path] - words
+                   if not any(stop.startswith(token) for stop in self.stopwords))
+
+    def _fallback(self, key):
+        if not self._fallbacks:
+            return None
+        index = int(hashlib.sha256(key.encode('utf-8')).hexdigest(), 16) % len(self._fallbacks)
+        return self._fallbacks[index]
+
+    def stats(self):
+        with self._lock:
+            return {'images': len(self._paths), 'tokens': len(self._postings), 'memo': len(self._memo)}
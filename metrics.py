@@ -0,0 +1,211 @@
+import bisect
+import os
+import threading
+import time
+
+# METRICS=0 turns span() into a shared no-op and skips the request/SQL hooks
+ENABLED = os.getenv('METRICS', '1') == '1'
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = {}    # (name, labels) -> float
+        self._gauges = {}      # (name, labels) -> float
+        self._help = {}
+
+    # Metric names are positional so `name` stays free as a label
+    def describe(self, metric, text):
+        self._help[metric] = text
+
+    def observe(self, metric, value, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, metric, amount=1, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, metric, value, **labels):
+        with self._lock:
+            self._gauges[(metric, tuple(sorted(labels.items())))] = value
+
+    def render(self):
+        # Prometheus text exposition format 0.0.4
+        with self._lock:
+            histograms = {k: (list(h.counts), h.total, h.count, h.buckets) for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, 'counter')
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), value in sorted(gauges.items()):
+            header(name, 'gauge')
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), (counts, total, count, buckets) in sorted(histograms.items()):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    if isinstance(value, str):
+        return value
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+registry = Registry()
+registry.describe('primalfit_span_seconds', 'Time spent in outbound calls and SQL statements')
+registry.describe('primalfit_span_total', 'Outbound calls and SQL statements by outcome')
+registry.describe('primalfit_request_seconds', 'Request handling time')
+registry.describe('primalfit_startup_seconds', 'Cold start time by phase')
+registry.describe('primalfit_rejected_total', 'Requests turned away with 429, by rule and reason')
+
+# Spans recorded by the current request, if any
+_trace = threading.local()
+
+
+class Span:
+    __slots__ = ('kind', 'name', 'ok', 'start')
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.ok = True
+        self.start = 0.0
+
+    def fail(self):
+        self.ok = False
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.ok = False
+        record(self.kind, self.name, time.perf_counter() - self.start, self.ok)
+        return False
+
+
+class _NoopSpan:
+    def fail(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(kind, name):
+    # with span('llm', 'groq') as s: ...; s.fail() marks a non-exception failure
+    return Span(kind, name) if ENABLED else _NOOP
+
+
+def record(kind, name, seconds, ok=True):
+    registry.observe('primalfit_span_seconds', seconds, kind=kind, name=name)
+    registry.inc('primalfit_span_total', kind=kind, name=name, outcome='ok' if ok else 'error')
+    spans = getattr(_trace, 'spans', None)
+    if spans is not None:
+        spans.append((kind, name, seconds, ok))
+
+
+def start_trace():
+    _trace.spans = []
+    _trace.start = time.perf_counter()
+
+
+def finish_trace():
+    # Returns (elapsed seconds, spans) and stops collecting for this thread
+    spans = getattr(_trace, 'spans', None)
+    if spans is None:
+        return None, []
+    elapsed = time.perf_counter() - _trace.start
+    _trace.spans = None
+    return elapsed, spans
+
+
+def breakdown(spans):
+    # {kind: (count, seconds)}
+    totals = {}
+    for kind, _, seconds, _ in spans:
+        count, total = totals.get(kind, (0, 0.0))
+        totals[kind] = (count + 1, total + seconds)
+    return totals
+
+
+def server_timing(elapsed, spans):
+    parts = [f"{kind};dur={seconds * 1000:.1f};desc=\"{count}x\""
+             for kind, (count, seconds) in sorted(breakdown(spans).items())]
+    parts.append(f"total;dur={elapsed * 1000:.1f}")
+    return ', '.join(parts)
+
+
+def instrument_engine(engine):
+    # SQL statement spans, labelled by verb (SELECT, INSERT, ...)
+    from sqlalchemy import event
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['metrics_start'].pop()
+        record('db', statement.lstrip().split(None, 1)[0].upper(), time.perf_counter() - started)
+
+    def failed(context):
+        starts = context.connection.info.get('metrics_start') if context.connection is not None else None
+        if starts:
+            statement = context.statement or 'UNKNOWN'
+            record('db', statement.lstrip().split(None, 1)[0].upper(), time.perf_counter() - starts.pop(), False)
+
+    event.listen(engine, 'before_cursor_execute', before)
+    event.listen(engine, 'after_cursor_execute', after)
+    event.listen(engine, 'handle_error', failed)
@@ -0,0 +1,214 @@
+import json
+import os
+
+# Deterministic nutrition plans: BMI, energy and macro targets are computed
+# here and meals come from the bundled recipes.json, so a plan needs no LLM
+# call. The result has the same shape as plan_parser.parse_nutrition().
+
+RECIPES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recipes.json')
+
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Share of the day's calories per meal
+MEALS = (('breakfast', 0.25), ('lunch', 0.35), ('dinner', 0.30), ('snack', 0.10))
+
+# Protein / carbs / fats as a percentage of calories
+MACRO_SPLITS = {
+    'balanced': {'protein': 30, 'carbs': 40, 'fats': 30},
+    'keto': {'protein': 25, 'carbs': 5, 'fats': 70},
+    'vegetarian': {'protein': 25, 'carbs': 50, 'fats': 25},
+    'vegan': {'protein': 20, 'carbs': 55, 'fats': 25},
+}
+KCAL_PER_GRAM = {'protein': 4, 'carbs': 4, 'fats': 9}
+
+ACTIVITY = {'sedentary': 1.2, 'light': 1.375, 'moderate': 1.55, 'active': 1.725, 'very active': 1.9}
+
+# Mifflin-St Jeor sex constant; the form doesn't ask, so default to the midpoint
+SEX_OFFSET = {'male': 5, 'female': -161}
+DEFAULT_SEX_OFFSET = -78
+DEFAULT_AGE = 30
+
+# Free-text allergies -> allergen tags used in recipes.json
+ALLERGY_ALIASES = {
+    'nut': 'nuts', 'tree nut': 'nuts', 'tree nuts': 'nuts', 'almond': 'nuts', 'almonds': 'nuts',
+    'peanut': 'peanuts', 'milk': 'dairy', 'lactose': 'dairy', 'cheese': 'dairy', 'egg': 'eggs',
+    'wheat': 'gluten', 'celiac': 'gluten', 'coeliac': 'gluten', 'soya': 'soy', 'tofu': 'soy',
+    'shellfish': 'fish', 'seafood': 'fish', 'sesame seeds': 'sesame',
+}
+
+DIET_TIPS = {
+    'balanced': 'Fill half of each plate with vegetables and keep a palm-sized protein portion at every meal',
+    'keto': 'Salt food a little more and eat leafy greens daily to keep electrolytes up while carbs are low',
+    'vegetarian': 'Pair dairy, eggs or legumes with every main meal to reach your protein target',
+    'vegan': 'Take a vitamin B12 supplement and combine legumes with grains for complete protein',
+}
+
+
+def calculate_bmi(weight, height):
+    try:
+        height_m = height / 100
+        return round(weight / (height_m ** 2), 1)
+    except ZeroDivisionError:
+        return None
+
+
+def get_bmi_note(bmi):
+    if bmi < 18.5:
+        return "Underweight - Consider increasing calorie intake"
+    elif 18.5 <= bmi < 25:
+        return "Healthy weight - Maintain your balance"
+    elif 25 <= bmi < 30:
+        return "Overweight - Consider gradual weight loss"
+    else:
+        return "Obese - Consult a healthcare professional"
+
+
+def energy_targets(weight, height, age=None, sex=None, activity=None):
+    # Returns (BMR, TDEE) in kcal/day
+    offset = SEX_OFFSET.get(str(sex or '').lower(), DEFAULT_SEX_OFFSET)
+    bmr = 10 * weight + 6.25 * height - 5 * (age or DEFAULT_AGE) + offset
+    factor = ACTIVITY.get(str(activity or '').lower().replace('_', ' '), ACTIVITY['light'])
+    return round(bmr), round(bmr * factor)
+
+
+def macro_grams(calories, split):
+    return {name: round(calories * percent / 100 / KCAL_PER_GRAM[name]) for name, percent in split.items()}
+
+
+def allergen_tags(allergies):
+    # "Peanuts, milk" -> {'peanuts', 'dairy'}; terms without a tag still
+    # match ingredient names
+    terms = set()
+    for item in str(allergies or '').replace(';', ',').replace(' and ', ',').split(','):
+        term = ' '.join(item.lower().split())
+        if term and term not in ('none', 'no', 'n/a'):
+            terms.add(ALLERGY_ALIASES.get(term, term))
+    return terms
+
+
+def load_recipes(path=RECIPES_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class NutritionEngine:
+    def __init__(self, recipes=None):
+        self.recipes = load_recipes() if recipes is None else recipes
+
+    def candidates(self, meal, diet_type, avoid, split):
+        # Recipes for a meal that suit the diet and allergies, closest macro
+        # profile first
+        found = []
+        for recipe in self.recipes:
+            if recipe['meal'] != meal or diet_type not in recipe['diets']:
+                continue
+            if avoid and (avoid & set(recipe['allergens']) or self._mentions(recipe, avoid)):
+                continue
+            found.append((self._distance(recipe, split), recipe['name'], recipe))
+        found.sort(key=lambda item: item[:2])
+        return [recipe for _, _, recipe in found]
+
+    @staticmethod
+    def _mentions(recipe, avoid):
+        # Whole-word prefix match so "nuts" skips "Mixed nuts" but not "Coconut milk"
+        words = {word for name, _, _ in recipe['ingredients'] for word in name.lower().split()}
+        return any(word.startswith(term.rstrip('s')) for term in avoid for word in words)
+
+    @staticmethod
+    def _distance(recipe, split):
+        kcal = sum(recipe[name] * KCAL_PER_GRAM[name] for name in split) or 1
+        return sum(abs(recipe[name] * KCAL_PER_GRAM[name] * 100 / kcal - percent) for name, percent in split.items())
+
+    def plan(self, weight, height, calories=None, diet_type='balanced', allergies='',
+             age=None, sex=None, activity=None):
+        diet_type = str(diet_type or 'balanced').lower()
+        if diet_type not in MACRO_SPLITS:
+            diet_type = 'balanced'
+        split = MACRO_SPLITS[diet_type]
+        bmi = calculate_bmi(weight, height)
+        bmr, tdee = energy_targets(weight, height, age, sex, activity)
+        try:
+            target = int(float(calories))
+        except (TypeError, ValueError):
+            target = 0
+        if target <= 0:
+            # No target given: a gentle deficit or surplus depending on BMI
+            target = round(tdee * (0.85 if bmi and bmi >= 25 else 1.1 if bmi and bmi < 18.5 else 1), -1)
+        grams = macro_grams(target, split)
+        avoid = allergen_tags(allergies)
+
+        notes = [f"Estimated maintenance: {tdee} kcal/day (BMR {bmr} kcal)"]
+        if target < bmr:
+            notes.append(f"Your target of {target} kcal is below your BMR; consider a smaller deficit")
+
+        menu = []
+        for meal, share in MEALS:
+            options = self.candidates(meal, diet_type, avoid, split)
+            if options:
+                # Rotate through the best few so the week isn't the same every day
+                menu.append((meal, share, options[:max(3, len(options) // 2)]))
+            else:
+                notes.append(f"No {meal} recipes match your diet and allergies")
+        # Meals that had to be dropped hand their calories to the rest
+        covered = sum(share for _, share, _ in menu) or 1
+
+        daily_meals, weekly_plan, grocery = [], {day: [] for day in DAYS}, {}
+        for meal, share, options in menu:
+            share /= covered
+            for index, day in enumerate(DAYS):
+                recipe = options[index % len(options)]
+                servings = min(2.5, max(0.5, round(target * share / recipe['kcal'] * 2) / 2))
+                weekly_plan[day].append(recipe['name'])
+                if index == 0:
+                    label = 'Snacks' if meal == 'snack' else meal.title()
+                    daily_meals.append({'type': label, 'items': [
+                        f"{recipe['name']} x{servings:g} ({round(recipe['kcal'] * servings)} kcal)"]})
+                for name, amount, unit in recipe['ingredients']:
+                    key = (name, unit)
+                    grocery[key] = grocery.get(key, 0) + amount * servings
+
+        prep = [
+            f"Drink about {weight * 0.035:.1f} L of water a day, more on training days",
+            DIET_TIPS[diet_type],
+            f"Aim for {grams['protein']} g protein, {grams['carbs']} g carbs and {grams['fats']} g fats a day",
+            'Batch-cook grains and proteins twice a week and portion them into containers',
+        ]
+
+        return {
+            'bmi': {'value': bmi, 'text': f"BMI {bmi} - {get_bmi_note(bmi)}" if bmi else ''},
+            'macros': dict(split),
+            'daily_meals': daily_meals,
+            'weekly_plan': {day: meals for day, meals in weekly_plan.items() if meals},
+            'grocery': [f"{name}: {_quantity(amount, unit)}" for (name, unit), amount in sorted(grocery.items())],
+            'prep': prep,
+            'notes': notes,
+            'targets': {'calories': target, 'bmr': bmr, 'tdee': tdee, 'diet_type': diet_type, **{
+                f'{name}_g': value for name, value in grams.items()}},
+        }
+
+
+def _quantity(amount, unit):
+    if unit == 'pc':
+        return f"{-(-amount // 1):g}"
+    if amount >= 1000:
+        return f"{amount / 1000:.1f} {'kg' if unit == 'g' else 'L'}"
+    return f"{round(amount):g} {unit}"
+
+
+def render(plan):
+    # Text form of a plan, in the section layout the nutrition page and
+    # plan_parser understand
+    lines = ['[BMI Analysis]', plan['bmi']['text'], '', '[Macronutrients]']
+    grams = plan.get('targets', {})
+    for name, percent in plan['macros'].items():
+        amount = grams.get(f'{name}_g')
+        lines.append(f"- {name.title()}: {percent}%" + (f" ({amount} g)" if amount is not None else ''))
+    lines += ['', '[Daily Meal Plan]']
+    lines += [f"- {meal['type']}: {', '.join(meal['items'])}" for meal in plan['daily_meals']]
+    lines += ['', '[Weekly Diet Plan]']
+    lines += [f"{day}: {', '.join(meals)}" for day, meals in plan['weekly_plan'].items()]
+    lines += ['', '[Grocery List]']
+    lines += [f"- {item}" for item in plan['grocery']]
+    lines += ['', '[Prep Tips]']
+    lines += [f"{number}. {tip}" for number, tip in enumerate(plan['prep'], 1)]
+    return '\n'.join(lines)
@@ -0,0 +1,329 @@
+import re
+
+# Incremental parsers for LLM plan text. Feed streamed chunks (or the whole
+# reply) and every line is classified exactly once; headers may come as
+# "[Header]", "Header:", "## Header" or "**Header**", and lines outside any
+# recognised section are still picked up when their shape is unambiguous.
+
+DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+_BULLET = re.compile(r'^\s*(?:[•·▪◦*\-–—]|\d{1,2}[.)])\s*')
+_DAY = re.compile(r'^(day\s*\d+|' + '|'.join(DAYS) + r')\b\s*(?:\([^)]*\))?\s*[:\-–—]\s*(.*)$', re.I)
+_KEY_VALUE = re.compile(r'^([A-Za-z][A-Za-z /\-]{0,30}?)\s*:\s*(.+)$')
+_NAMED = re.compile(r'^([^:]{1,60}?)\s*:\s*(.*)$')
+_SETS_REPS = re.compile(
+    r'(\d+)\s*(?:sets?\s*(?:of|x|×)|x|×)\s*(\d+(?:\s*[-–]\s*\d+)?\s*(?:s|sec|secs|seconds|min|mins|minutes|reps?)?\b)', re.I)
+_PART_SEPARATOR = re.compile(r'\s+[-–—|]\s+')
+_LIST_SEPARATOR = re.compile(r',\s*|;\s*')
+_MACRO_AFTER = re.compile(r'(protein|carbohydrates?|carbs?|fats?)\s*[:\-–]?\s*(\d{1,3}(?:\.\d+)?)\s*%', re.I)
+_MACRO_BEFORE = re.compile(r'(\d{1,3}(?:\.\d+)?)\s*%\s*(protein|carbohydrates?|carbs?|fats?)', re.I)
+_NUMBER = re.compile(r'\d{1,2}(?:\.\d+)?')
+
+
+def _normalize(name):
+    # "## 7-Day Plan", "[Weekly Plan]" -> "7 day plan", "weekly plan"
+    return ' '.join(name.strip(' #*_[]').lower().replace('-', ' ').split())
+
+
+def _aliases(table):
+    return {_normalize(alias): section for section, aliases in table.items() for alias in aliases}
+
+
+WORKOUT_SECTIONS = _aliases({
+    'schedule': ('workout schedule', 'schedule', 'weekly schedule', 'training schedule', 'weekly plan',
+                 'workout plan', 'weekly workout plan'),
+    'exercises': ('exercise details', 'exercises', 'exercise breakdown', 'exercise descriptions',
+                  'exercise list', 'exercise instructions'),
+    'progression': ('progression plan', 'progression', 'progressive overload', 'weekly progression',
+                    'progression tips'),
+})
+
+NUTRITION_SECTIONS = _aliases({
+    'bmi': ('bmi analysis', 'bmi', 'bmi result', 'body mass index'),
+    'macros': ('macronutrients', 'macros', 'macronutrient split', 'macronutrient breakdown',
+               'macronutrient distribution'),
+    'daily_meals': ('daily meal plan', 'meal plan', 'daily meals', 'sample day', 'daily plan'),
+    'weekly_plan': ('weekly diet plan', 'weekly plan', 'weekly meal plan', '7 day plan', '7 day meal plan',
+                    'weekly overview', '7 day meal overview'),
+    'grocery': ('grocery list', 'shopping list', 'groceries'),
+    'prep': ('prep tips', 'meal prep tips', 'preparation tips', 'tips', 'meal prep'),
+})
+
+
+def strip_bullet(line):
+    return _BULLET.sub('', line, count=1).strip()
+
+
+def split_items(text):
+    return [item.strip(' .') for item in _LIST_SEPARATOR.split(text) if item.strip(' .')]
+
+
+def exercise_key(name):
+    # Same key the workout page uses to look up exercise images
+    return name.lower().replace(' ', '_')
+
+
+class PlanParser:
+    SECTIONS = {}
+
+    def __init__(self):
+        self.section = None
+        self._buffer = ''
+
+    def feed(self, chunk):
+        # Only complete lines are parsed; the tail waits for the next chunk
+        self._buffer += chunk
+        if '\n' not in self._buffer:
+            return
+        *lines, self._buffer = self._buffer.split('\n')
+        for line in lines:
+            self._parse_line(line)
+
+    def finish(self):
+        if self._buffer:
+            self._parse_line(self._buffer)
+            self._buffer = ''
+        return self.result()
+
+    def _parse_line(self, raw):
+        line = raw.replace('**', '').strip()
+        if not line:
+            return
+        header = self._header(line)
+        if header is not None:
+            self.section, rest = header
+            if rest:
+                self.line(rest)
+            return
+        self.line(line)
+
+    def _header(self, line):
+        # Returns (section, text after the header) or None; one dict lookup per line
+        if line[0] == '[':
+            name, _, rest = line[1:].partition(']')
+        else:
+            name, _, rest = line.partition(':')
+        if len(name) > 48:
+            return None
+        section = self.SECTIONS.get(_normalize(name))
+        if section is None:
+            return None
+        return section, rest.strip(' :')
+
+    def line(self, line):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+class WorkoutParser(PlanParser):
+    SECTIONS = WORKOUT_SECTIONS
+    LEGACY_FIELDS = {'type': 'type', 'muscle group': 'muscle_group', 'sets': 'sets', 'reps': 'reps',
+                     'reps/duration': 'reps', 'duration': 'reps', 'intensity': 'intensity'}
+
+    def __init__(self):
+        super().__init__()
+        self.schedule = []
+        self.exercises = []
+        self.progression = []
+        self.notes = []
+        self._by_key = {}
+        self._current = None  # "Exercise: X" block being filled in
+
+    def line(self, line):
+        text = strip_bullet(line)
+        if not text:
+            return
+
+        if self.section != 'progression':
+            day = _DAY.match(text)
+            if day:
+                # "Day 1 - Upper Body: Bench Press, Rows" carries a focus before the list
+                focus, _, listed = day.group(2).rpartition(':')
+                exercises = split_items(listed)
+                rest = not exercises or all(e.lower().startswith('rest') for e in exercises)
+                self.schedule.append({'day': day.group(1).strip().title(), 'focus': focus.strip(),
+                                      'exercises': [] if rest else exercises, 'rest': rest})
+                return
+
+        if self.section == 'progression':
+            self.progression.append(text)
+            return
+
+        pair = _KEY_VALUE.match(text)
+        if pair:
+            key, value = _normalize(pair.group(1)), pair.group(2).strip()
+            if key in ('exercise', 'exercise name'):
+                self._current = self._exercise(value, '')
+                return
+            field = self.LEGACY_FIELDS.get(pair.group(1).strip().lower())
+            if field and self._current is not None:
+                self._current[field] = value
+                return
+
+        # "• Push-ups: Chest - 3x12 - ..." under Exercise Details, or bulleted anywhere else
+        named = _NAMED.match(text)
+        if named and (self.section == 'exercises' or (self.section is None and text != line.strip())):
+            self._current = None
+            self._exercise(named.group(1), named.group(2).strip())
+            return
+
+        self.notes.append(text)
+
+    def _exercise(self, name, details):
+        exercise = parse_exercise(name, details)
+        key = exercise['key']
+        if key in self._by_key:
+            # Later mentions fill in what earlier ones left out
+            known = self._by_key[key]
+            for field, value in exercise.items():
+                if value and not known.get(field):
+                    known[field] = value
+            return known
+        self._by_key[key] = exercise
+        self.exercises.append(exercise)
+        return exercise
+
+    def result(self):
+        return {
+            'schedule': self.schedule,
+            'exercises': self.exercises,
+            'progression': self.progression,
+            'notes': self.notes,
+        }
+
+
+def parse_exercise(name, details):
+    # "Push-ups", "Chest - 3x12 - Keep your core tight"
+    name = name.strip(' *')
+    exercise = {'name': name, 'key': exercise_key(name), 'details': details,
+                'muscle_group': '', 'sets': '', 'reps': '', 'description': ''}
+    description = []
+    for index, part in enumerate(p.strip() for p in _PART_SEPARATOR.split(details) if p.strip()):
+        sets_reps = _SETS_REPS.search(part) if not exercise['sets'] else None
+        if sets_reps:
+            exercise['sets'] = sets_reps.group(1)
+            exercise['reps'] = sets_reps.group(2).strip()
+            leftover = (part[:sets_reps.start()] + part[sets_reps.end():]).strip(' ,.')
+            if leftover:
+                description.append(leftover)
+        elif index == 0 and len(part) <= 40 and not part.endswith('.'):
+            exercise['muscle_group'] = part
+        else:
+            description.append(part)
+    exercise['description'] = ' - '.join(description)
+    return exercise
+
+
+class NutritionParser(PlanParser):
+    SECTIONS = NUTRITION_SECTIONS
+
+    def __init__(self):
+        super().__init__()
+        self.bmi = {'value': None, 'text': []}
+        self.macros = {}
+        self.daily_meals = []
+        self.weekly_plan = {}
+        self.grocery = []
+        self.prep = []
+        self.notes = []
+
+    def line(self, line):
+        text = strip_bullet(line)
+        if not text:
+            return
+        section = self.section
+
+        if section in ('macros', None) and self._macros(text):
+            return
+        if section == 'bmi':
+            number = _NUMBER.search(text) if self.bmi['value'] is None else None
+            if number:
+                self.bmi['value'] = float(number.group())
+            self.bmi['text'].append(text)
+            return
+        if section == 'weekly_plan' or (section is None and _DAY.match(text)):
+            day = _DAY.match(text)
+            if day:
+                self.weekly_plan[day.group(1).strip().title()] = split_items(day.group(2))
+            elif self.weekly_plan:
+                self.weekly_plan[list(self.weekly_plan)[-1]].extend(split_items(text))
+            else:
+                self.notes.append(text)
+            return
+        if section == 'daily_meals':
+            pair = _KEY_VALUE.match(text)
+            if pair:
+                self.daily_meals.append({'type': pair.group(1).strip().title(), 'items': split_items(pair.group(2))})
+            elif self.daily_meals:
+                self.daily_meals[-1]['items'].append(text)
+            else:
+                self.daily_meals.append({'type': text.rstrip(':').title(), 'items': []})
+            return
+        if section == 'grocery':
+            self.grocery.append(text)
+            return
+        if section == 'prep':
+            self.prep.append(text)
+            return
+        self.notes.append(text)
+
+    def _macros(self, text):
+        found = False
+        for name, value in _MACRO_AFTER.findall(text):
+            self.macros[_macro_name(name)] = _percent(value)
+            found = True
+        for value, name in _MACRO_BEFORE.findall(text):
+            self.macros.setdefault(_macro_name(name), _percent(value))
+            found = True
+        return found
+
+    def result(self):
+        return {
+            'bmi': {'value': self.bmi['value'], 'text': ' '.join(self.bmi['text'])},
+            'macros': self.macros,
+            'daily_meals': self.daily_meals,
+            'weekly_plan': self.weekly_plan,
+            'grocery': self.grocery,
+            'prep': self.prep,
+            'notes': self.notes,
+        }
+
+
+def _macro_name(name):
+    name = name.lower()
+    if name.startswith('carb'):
+        return 'carbs'
+    if name.startswith('fat'):
+        return 'fats'
+    return 'protein'
+
+
+def _percent(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def parse_workout(text):
+    parser = WorkoutParser()
+    parser.feed(text)
+    return parser.finish()
+
+
+def parse_nutrition(text):
+    parser = NutritionParser()
+    parser.feed(text)
+    return parser.finish()
+
+
+def exercise_names(workout):
+    # Every distinct exercise in the plan: detailed ones first, then any only
+    # named in the schedule
+    names = {}
+    for exercise in workout['exercises']:
+        names.setdefault(exercise['key'], exercise['name'])
+    for day in workout['schedule']:
+        for name in day['exercises']:
+            names.setdefault(exercise_key(name), name)
+    return list(names.values())
@@ -0,0 +1,190 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip alone covers every browser
+    brotli = None
+
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.webmanifest', '.txt', '.map'}
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+IMMUTABLE = 'public, max-age=31536000, immutable'
+SKIP_DIRS = {'.incoming'}
+
+_FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{12})(?P<ext>\.[^./]+)$')
+# Image cache files are already named after their content
+_CONTENT_ADDRESSED = re.compile(r'(^|/)[0-9a-f]{24}(-\d+)?\.[a-z0-9]+$')
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class StaticAssets:
+    MANIFEST_NAME = 'manifest.json'
+
+    def __init__(self, static_dir, watch=False, max_age=300):
+        self.static_dir = static_dir
+        self.watch = watch  # re-hash files whose mtime/size changed (development)
+        self.max_age = max_age  # for files requested without a fingerprint
+        self.manifest_path = os.path.join(static_dir, self.MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._hashed = {}    # logical name -> (stamp, fingerprinted name)
+        self._logical = {}   # fingerprinted name -> logical name
+        self._load()
+
+    def _load(self):
+        # A manifest from `flask build-assets` saves hashing at runtime
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        for logical, hashed in manifest.items():
+            self._remember(logical, None, hashed)
+
+    def _remember(self, logical, stamp, hashed):
+        self._hashed[logical] = (stamp, hashed)
+        self._logical[hashed] = logical
+
+    @staticmethod
+    def _stamp(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def fingerprint(self, filename):
+        # "css/styles.css" -> "css/styles.3f2a9c1d0e4b.css"; unknown files pass through
+        if _CONTENT_ADDRESSED.search(filename):
+            return filename
+        with self._lock:
+            known = self._hashed.get(filename)
+        if known and not self.watch:
+            return known[1]
+        path = os.path.join(self.static_dir, filename)
+        try:
+            stamp = self._stamp(path)
+            if known and known[0] == stamp:
+                return known[1]
+            stem, ext = os.path.splitext(filename)
+            hashed = f"{stem}.{file_digest(path)}{ext}"
+        except OSError:
+            return filename
+        with self._lock:
+            self._remember(filename, stamp, hashed)
+        return hashed
+
+    def resolve(self, requested):
+        # Returns (file on disk, immutable?) for a requested static path
+        if safe_join(self.static_dir, requested) is None:
+            return requested, False  # send_from_directory turns this into a 404
+        if _CONTENT_ADDRESSED.search(requested):
+            return requested, True
+        with self._lock:
+            logical = self._logical.get(requested)
+        if logical is None:
+            match = _FINGERPRINTED.match(requested)
+            if not match or os.path.isfile(os.path.join(self.static_dir, requested)):
+                return requested, False
+            logical = match.group('stem') + match.group('ext')
+        # Only a fingerprint that matches the current content is immutable;
+        # a stale one still gets the current file, just not cached for a year
+        return logical, self.fingerprint(logical) == requested
+
+    def _files(self):
+        for current, dirs, files in os.walk(self.static_dir):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            for name in files:
+                if name == self.MANIFEST_NAME or name.endswith(('.gz', '.br')):
+                    continue
+                yield os.path.relpath(os.path.join(current, name), self.static_dir).replace(os.sep, '/')
+
+    def precompress(self, filename):
+        # Writes .gz (and .br when brotli is installed) next to the file if stale
+        path = os.path.join(self.static_dir, filename)
+        if os.path.splitext(filename)[1].lower() not in COMPRESSIBLE:
+            return 0
+        with open(path, 'rb') as f:
+            data = f.read()
+        written = 0
+        for encoding, suffix in ENCODINGS:
+            target = path + suffix
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                continue
+            if encoding == 'br':
+                if brotli is None:
+                    continue
+                compressed = brotli.compress(data, quality=11)
+            else:
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) >= len(data):
+                continue
+            tmp_path = f"{target}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, target)
+            written += 1
+        return written
+
+    def build(self, write_manifest=True):
+        # Fingerprints and precompresses everything except the image cache
+        manifest = {}
+        compressed = 0
+        for filename in self._files():
+            if _CONTENT_ADDRESSED.search(filename) or filename.startswith('generated/'):
+                continue
+            manifest[filename] = self.fingerprint(filename)
+            compressed += self.precompress(filename)
+        if write_manifest:
+            tmp_path = f"{self.manifest_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+        return manifest, compressed
+
+    def send(self, filename):
+        # Replaces Flask's static view, hence the `filename` argument name
+        filename, immutable = self.resolve(filename)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        accepted = request.headers.get('Accept-Encoding', '')
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and self._precompressed(filename, suffix):
+                response = send_from_directory(self.static_dir, filename + suffix, mimetype=mimetype,
+                                               max_age=self.max_age)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(self.static_dir, filename, mimetype=mimetype, max_age=self.max_age)
+        if os.path.splitext(filename)[1].lower() in COMPRESSIBLE:
+            response.vary.add('Accept-Encoding')
+        if immutable:
+            response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+    def _precompressed(self, filename, suffix):
+        path = os.path.join(self.static_dir, filename)
+        try:
+            compressed_at = os.path.getmtime(path + suffix)
+        except OSError:
+            return False
+        return not self.watch or compressed_at >= os.path.getmtime(path)
+
+    def install(self, app):
+        # url_for('static', ...) emits fingerprinted names and the static view maps them back
+        @app.url_defaults
+        def _fingerprint_static(endpoint, values):
+            if endpoint == 'static' and 'filename' in values:
+                values['filename'] = self.fingerprint(values['filename'])
+
+        app.view_functions['static'] = self.send
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+
+
+class CachedUser(UserMixin):
+    # Detached snapshot of a User: safe to share across requests and threads
+    def __init__(self, id, name, age, email):
+        self.id = id
+        self.name = name
+        self.age = age
+        self.email = email
+
+    @classmethod
+    def from_model(cls, user):
+        return cls(user.id, user.name, user.age, user.email)
+
+    def to_dict(self):
+        return {'id': self.id, 'name': self.name, 'age': self.age, 'email': self.email}
+
+
+class UserCache:
+    def __init__(self, ttl=300, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._invalidated = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user):
+        with self._lock:
+            self._entries[user.id] = (time.time(), user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._invalidated[user_id] = time.time()
+
+    def is_stale(self, user_id, issued_at):
+        # Session-held identities issued before the last invalidation are stale
+        with self._lock:
+            invalidated = self._invalidated.get(user_id)
+        return invalidated is not None and issued_at <= invalidated
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl}